@@ -0,0 +1,116 @@
+# Disk-backed cache of synthesized speech.
+#
+# The same phrases are spoken again and again (the canned "rest of the answer
+# is on the chat screen" lines, greetings, short replies), and every one of
+# them used to cost a fresh edge-tts round trip. Audio is stored under a hash
+# of (text, voice, pitch, rate) in Data/AudioCache and evicted in LRU order
+# once the cache grows past its byte budget.
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+CacheDirectory = r"Data/AudioCache"
+MaxBytes = 50 * 1024 * 1024
+
+
+def AudioKey(text, voice, pitch, rate):
+    raw = json.dumps([text, voice, pitch, rate], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """Content-addressed MP3 store with size-bounded LRU eviction."""
+
+    def __init__(self, directory=CacheDirectory, max_bytes=MaxBytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(directory, "index.json")
+        self.entries = {}   # key -> {"size": bytes, "used": last access time}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (FileNotFoundError, ValueError):
+            entries = {}
+        # Drop entries whose audio file has gone missing.
+        self.entries = {k: v for k, v in entries.items() if os.path.exists(self._path(k))}
+
+    def _save(self):
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(temp_path, self.index_path)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def get(self, text, voice, pitch, rate):
+        key = AudioKey(text, voice, pitch, rate)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                try:
+                    with open(self._path(key), "rb") as f:
+                        data = f.read()
+                except OSError:
+                    del self.entries[key]
+                else:
+                    entry["used"] = time.time()
+                    self.hits += 1
+                    return data
+            self.misses += 1
+            return None
+
+    def contains(self, text, voice, pitch, rate):
+        with self._lock:
+            return AudioKey(text, voice, pitch, rate) in self.entries
+
+    def put(self, text, voice, pitch, rate, data):
+        if not data:
+            return
+        key = AudioKey(text, voice, pitch, rate)
+        with self._lock:
+            try:
+                with open(self._path(key), "wb") as f:
+                    f.write(data)
+            except OSError as e:
+                print(f"Error writing audio cache: {e}")
+                return
+            self.entries[key] = {"size": len(data), "used": time.time()}
+            self._evict()
+            try:
+                self._save()
+            except OSError as e:
+                print(f"Error writing audio cache: {e}")
+
+    # Remove least recently used clips until the cache fits its byte budget.
+    def _evict(self):
+        total = sum(e["size"] for e in self.entries.values())
+        for key in sorted(self.entries, key=lambda k: self.entries[k]["used"]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                continue   # Still in use; try again on the next put.
+            total -= self.entries.pop(key)["size"]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": sum(e["size"] for e in self.entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
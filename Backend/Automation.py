@@ -1,21 +1,22 @@
 # Import required libraries
-from AppOpener import close, open as appopen  # Import functions to open and close apps.
+# AppOpener, pywhatkit, bs4, groq, requests and keyboard are slow to import, so
+# they are imported inside the functions that use them rather than at startup.
 from webbrowser import open as webopen        # Import web browser functionality.
-from pywhatkit import search, playonyt        # Import functions for Google search and YouTube playback.
 from dotenv import dotenv_values              # Import dotenv to manage environment variables.
-from bs4 import BeautifulSoup                 # Import BeautifulSoup for parsing HTML content.
 from rich import print                        # Import rich for styled console output.
-from groq import Groq                         # Import Groq for AI chat functionalities.
 import webbrowser                             # Import webbrowser for opening URLs.
 import subprocess                             # Import subprocess for interacting with the system.
-import requests                               # Import requests for making HTTP requests.
-import keyboard                               # Import keyboard for keyboard-related actions.
+import threading                              # Import threading to guard lazily created clients.
 import asyncio                                # Import asyncio for asynchronous programming.
 import os                                     # Import os for operating system functionalities.
 
 
 env_vars = dotenv_values(".env")
 GroqAPIKey = env_vars.get("GroqAPIKey")  # Retrieve the Groq API key.
+Username = os.environ.get("Username") or env_vars.get("Username")  # Windows user name, or the one from .env.
+
+# With AutomationDryRun=True commands are reported instead of executed.
+DryRun = str(env_vars.get("AutomationDryRun", "False")).lower() == "true"
 
 # Define CSS classes for parsing specific elements in HTML content.
 classes = ["zCubwf", "hgKElc", "LTKOO SYYric", "Z0LcW", "gsrt vk_bk FzvWSb YwPhnf", "pclqee", "tw-Data-text tw-text-small tw-ta",
@@ -25,8 +26,26 @@ classes = ["zCubwf", "hgKElc", "LTKOO SYYric", "Z0LcW", "gsrt vk_bk FzvWSb YwPhn
 # Define a user-agent for making web requests.
 useragent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.4896.75 Safari/537.36'
 
-# Initialize the Groq client with the API key.
-client = Groq(api_key=GroqAPIKey)
+# Groq client and HTTP session, created on first use.
+client = None
+session = None
+_client_lock = threading.Lock()
+
+def GetClient():
+    global client
+    with _client_lock:
+        if client is None:
+            from groq import Groq   # Import Groq for AI chat functionalities.
+            client = Groq(api_key=GroqAPIKey)
+        return client
+
+def GetSession():
+    global session
+    with _client_lock:
+        if session is None:
+            import requests   # Import requests for making HTTP requests.
+            session = requests.session()
+        return session
 
 # Predefined professional responses for user interactions.
 professional_responses = [
@@ -34,15 +53,13 @@ professional_responses = [
     "I'm at your service for any additional questions or support you may need—don't hesitate to ask.",
 ]
 
-# List to store chatbot messages.
-messages = []
-
 
 # System message to provide context to the chatbot.
-SystemChatBot = [{"role": "system", "content": f"Hello, I am {os.environ['Username']}, You're a content writer. You have to write content like lette"}]
+SystemChatBot = [{"role": "system", "content": f"Hello, I am {Username}, You're a content writer. You have to write content like lette"}]
 
 # Function to perform a Google search.
 def GoogleSearch(Topic):
+    from pywhatkit import search   # Import pywhatkit's Google search.
     search(Topic)  # Use pywhatkit's search function to perform a Google search.
     return True    # Indicate success.
 
@@ -56,10 +73,10 @@ def Content(Topic):
 
     # Nested function to generate content using the AI chatbot.
     def ContentWriterAI(prompt):
-        messages.append({"role": "user", "content": f"{prompt}"})  # Add the user's prompt to messages.
-        completion = client.chat.completions.create(
+        messages = [{"role": "user", "content": f"{prompt}"}]  # Each piece of content is written from its own prompt.
+        completion = GetClient().chat.completions.create(
             model="llama-3.1-8b-instant",  # Specify the AI model.
-            messages=SystemChatBot + messages,  # Include system instructions and chat history.
+            messages=SystemChatBot + messages,  # Include system instructions and the prompt.
             max_tokens=2048,  # Limit the maximum tokens in the response.
             temperature=0.7,  # Adjust response randomness.
             top_p=1,  # Use nucleus sampling for response diversity.
@@ -74,7 +91,6 @@ def Content(Topic):
             if chunk.choices[0].delta.content:  # Check for content in the current chunk.
                 Answer += chunk.choices[0].delta.content  # Append the content to the answer.
         Answer = Answer.replace("</s>", "")  # Remove unwanted tokens from the response.
-        messages.append({"role": "assistant", "content": Answer})  # Add the AI's response to messages.
         return Answer
 
     Topic: str = Topic.replace("Content ", "")  # Remove "Content " from the topic.
@@ -94,11 +110,14 @@ def YouTubeSearch(Topic):
 
     # Function to play a video on YouTube.
 def PlayYoutube(query):
+    from pywhatkit import playonyt   # Import pywhatkit's YouTube playback.
 
     playonyt(query)  # Use pywhatkit's playonyt function to play the video.
     return True  # Indicate success.
 
-def OpenApp(app, sess=requests.session()):
+def OpenApp(app, sess=None):
+    from AppOpener import open as appopen   # Import AppOpener's app launcher.
+    sess = sess or GetSession()
 
     try:
         appopen(app, match_closest=True, output=True, throw_error=True)  # Attempt to open the app.
@@ -107,6 +126,7 @@ def OpenApp(app, sess=requests.session()):
     except:
         # Nested function to extract links from HTML content.
         def extract_links(html):
+            from bs4 import BeautifulSoup   # Import BeautifulSoup for parsing HTML content.
             if html is None:
                 return []
             soup = BeautifulSoup(html, 'html.parser')  # Parse the HTML content.
@@ -135,6 +155,7 @@ def CloseApp(app):
     if "chrome" in app:
         pass  # Skip if the app is Chrome.
     else:
+        from AppOpener import close   # Import AppOpener's app closer.
         try:
             close(app, match_closest=True, output=True, throw_error=True)  # Attempt to close the app.
             return True  # Indicate success.
@@ -143,6 +164,7 @@ def CloseApp(app):
 
 # Function to execute system-level commands.
 def System(command):
+    import keyboard   # Import keyboard for keyboard-related actions.
 
     # Nested function to mute the system volume.
     def mute():
@@ -169,9 +191,16 @@ def System(command):
     return True  # Indicate success 
 
 
-async def TranslateAndExecute(commands: list[str]):
+async def TranslateAndExecute(commands: list[str], dry_run: bool = None):
 
     funcs = []  # List to store asynchronous tasks.
+    dry_run = DryRun if dry_run is None else dry_run
+
+    # Run the action on a worker thread, or in a dry run just report what it would do.
+    def schedule(func, arg):
+        if dry_run:
+            return asyncio.sleep(0, result=f"{func.__name__}({arg!r})")
+        return asyncio.to_thread(func, arg)
 
     for command in commands:
 
@@ -184,7 +213,7 @@ async def TranslateAndExecute(commands: list[str]):
                 pass
             else:
                 clean_cmd = command.replace("open ", "").strip()
-                fun = asyncio.to_thread(OpenApp, clean_cmd)
+                fun = schedule(OpenApp, clean_cmd)
   # Create an asynchronous task.
                 funcs.append(fun)  # Add the task to the list.
         elif command.startswith("general "):  # Placeholder for general commands.
@@ -194,25 +223,25 @@ async def TranslateAndExecute(commands: list[str]):
             pass
 
         elif command.startswith("close "):  # Handle "close" commands.
-            fun = asyncio.to_thread(CloseApp, command.removeprefix("close "))  # Schedule a thread task.
+            fun = schedule(CloseApp, command.removeprefix("close "))  # Schedule a thread task.
             funcs.append(fun)
 
         elif command.startswith("play "):  # Handle "play" commands.
-            fun = asyncio.to_thread(PlayYoutube, command.removeprefix("play "))  # Schedule a thread task.
+            fun = schedule(PlayYoutube, command.removeprefix("play "))  # Schedule a thread task.
             funcs.append(fun)
         elif command.startswith("content "):  # Handle "content" commands.
-            fun = asyncio.to_thread(Content, command.removeprefix("content "))  # Schedule content creation.
+            fun = schedule(Content, command.removeprefix("content "))  # Schedule content creation.
             funcs.append(fun)
 
         elif command.startswith("google search "):  # Handle Google search commands.
-            fun = asyncio.to_thread(GoogleSearch, command.removeprefix("google search "))  # Schedule Google search.
+            fun = schedule(GoogleSearch, command.removeprefix("google search "))  # Schedule Google search.
             funcs.append(fun)
 
         elif command.startswith("youtube search "):  # Handle YouTube search commands.
-            fun = asyncio.to_thread(YouTubeSearch, command.removeprefix("youtube search "))  # Schedule YouTube search.
+            fun = schedule(YouTubeSearch, command.removeprefix("youtube search "))  # Schedule YouTube search.
             funcs.append(fun)
         elif command.startswith("system "):  # Handle system commands.
-            fun = asyncio.to_thread(System, command.removeprefix("system "))  # Schedule system command.
+            fun = schedule(System, command.removeprefix("system "))  # Schedule system command.
             funcs.append(fun)
 
         else:
@@ -225,9 +254,9 @@ async def TranslateAndExecute(commands: list[str]):
             yield result
 
 # Asynchronous function to automate command execution.
-async def Automation(commands: list[str]):
+async def Automation(commands: list[str], dry_run: bool = None):
 
-    async for result in TranslateAndExecute(commands):  # Translate and execute commands.
+    async for result in TranslateAndExecute(commands, dry_run):  # Translate and execute commands.
         pass
 
     return True  # Indicate success.
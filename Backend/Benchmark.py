@@ -0,0 +1,260 @@
+# End-to-end pipeline benchmark with local stand-ins for every provider.
+#
+# The Cohere, Gemini and Groq clients, Google search, edge-tts synthesis,
+# pygame playback and the automation actions are replaced by fakes that
+# stream with a configurable first-token latency and token rate, so the whole
+# assistant can be measured on a headless machine with no network or audio.
+# Queries from a scripted corpus go through the same steps as MainExecution
+# (decision, concurrent tasks, streamed answers, sentence-pipelined speech)
+# without the GUI, and per-stage latencies come from Backend.Tracing.
+#
+# Chat log, decision cache and audio cache live in a temporary directory, and
+# decisions are not added to the intent model's training log.
+#
+# Corpus files hold one query per line, or JSONL {"query", "decision", "delay"}
+# where decision is what the fake decision model answers (default
+# "general <query>") and delay is the simulated speaking time in seconds.
+#
+# Usage:
+#   python -m Backend.Benchmark [--queries FILE] [--repeat N] [--concurrency N]
+#                               [--first-token 0.3] [--tokens-per-second 40]
+#                               [--no-speech] [--speculate] [--verbose]
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+# Built-in corpus: single answers, automation, compound requests and repeats.
+DefaultCorpus = [
+    {"query": "who was akbar", "decision": ["general who was akbar"]},
+    {"query": "how can i study more effectively", "decision": ["general how can i study more effectively"]},
+    {"query": "what is today's news", "decision": ["realtime what is today's news"]},
+    {"query": "open notepad"},
+    {"query": "open chrome and tell me about gandhi", "decision": ["open chrome", "general tell me about gandhi"]},
+    {"query": "who is the prime minister of india and play let her go",
+     "decision": ["realtime who is the prime minister of india", "play let her go"]},
+    {"query": "mute the volume", "decision": ["system mute"]},
+    {"query": "write an application for sick leave", "decision": ["content application for sick leave"]},
+    {"query": "what's the weather in delhi", "decision": ["realtime what's the weather in delhi"]},
+    {"query": "who was akbar", "decision": ["general who was akbar"]},
+]
+
+Words = ("the quick answer to that is simple and it depends on a few things you should know about "
+         "history science and the people involved in it").split()
+
+
+class FakeTiming:
+    """Streaming behaviour of a fake provider."""
+
+    def __init__(self, first_token=0.3, tokens_per_second=40.0, tokens=60):
+        self.first_token = first_token
+        self.tokens_per_second = tokens_per_second
+        self.tokens = tokens
+
+    def stream(self, tokens=None):
+        time.sleep(self.first_token)
+        for n in range(tokens or self.tokens):
+            if n:
+                time.sleep(1 / self.tokens_per_second)
+            # End a sentence every 12 words so speech can be pipelined.
+            yield Words[n % len(Words)] + ("." if n % 12 == 11 else "") + " "
+
+
+class FakeCohere:
+    def __init__(self, timing, decisions):
+        self.timing = timing
+        self.decisions = decisions   # normalized query -> decision list
+
+    def chat_stream(self, message, **kwargs):
+        from Backend.DecisionCache import NormalizeQuery
+
+        decision = self.decisions.get(NormalizeQuery(message)) or [f"general {message}"]
+        time.sleep(self.timing.first_token)
+        for token in ", ".join(decision).split(" "):
+            time.sleep(1 / self.timing.tokens_per_second)
+            yield SimpleNamespace(event_type="text-generation", text=token + " ")
+        yield SimpleNamespace(event_type="stream-end", text="")
+
+
+class FakeGemini:
+    def __init__(self, timing):
+        self.models = SimpleNamespace(generate_content_stream=self.generate_content_stream)
+        self.timing = timing
+
+    def generate_content_stream(self, **kwargs):
+        for text in self.timing.stream():
+            yield SimpleNamespace(text=text)
+
+
+class FakeGroq:
+    def __init__(self, timing):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        self.timing = timing
+
+    def create(self, **kwargs):
+        for text in self.timing.stream():
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+class FakeAudioOutput:
+    """Plays nothing; takes as long as speaking the clip would."""
+
+    def __init__(self, words_per_second):
+        self.words_per_second = words_per_second
+
+    def start(self):
+        pass
+
+    def play(self, data, func=lambda r=None: True):
+        time.sleep(len(data.split()) / self.words_per_second)
+        return True
+
+
+def InstallFakes(directory, chat_timing, search_timing, decision_timing, decisions,
+                 search_seconds=0.4, synth_seconds=0.15, words_per_second=30.0, automation_seconds=0.5):
+    """Point every backend at local stand-ins and temporary storage."""
+    from Backend import Model, Chatbot, RealtimeSearchEngine, Automation, TextToSpeech, IntentModel
+    from Backend.AudioCache import AudioCache
+    from Backend.ChatHistory import ChatHistoryStore
+    from Backend.DecisionCache import DecisionCache
+    from Backend.Tracing import Span
+
+    # Decision model: fake Cohere, fresh cache, no offline model, no training log.
+    Model.co = FakeCohere(decision_timing, decisions)
+    Model.Cache = DecisionCache(path=os.path.join(directory, "DecisionCache.json"))
+    Model.OfflineModel, Model._offline_loaded = None, True
+    IntentModel.LogDecision = lambda *args, **kwargs: None
+
+    # Answer models share a throwaway chat log.
+    store = ChatHistoryStore(path=os.path.join(directory, "ChatLog.db"), legacy_path=None)
+    Chatbot.client = FakeGemini(chat_timing)
+    Chatbot.History = store
+    RealtimeSearchEngine.client = FakeGroq(search_timing)
+    RealtimeSearchEngine.History = store
+
+    def search(query):
+        with Span("search"):
+            time.sleep(search_seconds)
+            return f"The search results for '{query}' are:\n[start]\n[end]"
+    RealtimeSearchEngine.GoogleSearch = search
+
+    # Automation actions only take time; content writing still streams from the fake Groq client.
+    def action(*args):
+        time.sleep(automation_seconds)
+        return True
+
+    def content(topic):
+        return "".join(chunk.choices[0].delta.content for chunk in Automation.GetClient().chat.completions.create())
+
+    Automation.client = FakeGroq(chat_timing)
+    for name in ("OpenApp", "CloseApp", "PlayYoutube", "GoogleSearch", "YouTubeSearch", "System"):
+        setattr(Automation, name, action)
+    Automation.Content = content
+
+    # Speech: the "audio" is the encoded text, so playback time follows its word count.
+    async def synthesize(text):
+        await asyncio.sleep(synth_seconds)
+        return text.encode("utf-8")
+
+    TextToSpeech.TextToAudioBytes = synthesize
+    TextToSpeech.Cache = AudioCache(directory=os.path.join(directory, "AudioCache"))
+    TextToSpeech.Output = FakeAudioOutput(words_per_second)
+
+
+def ReadCorpus(path):
+    corpus = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            corpus.append(json.loads(line) if line.startswith("{") else {"query": line})
+    return corpus
+
+
+def ExecuteQuery(entry, orchestrator, speech=True, speculate=False):
+    """One MainExecution without the GUI: simulated listening, then the shared pipeline."""
+    from Backend.Pipeline import RunQuery
+    from Backend.Tracing import Span, StartTrace
+
+    StartTrace()
+    with Span("execution"):
+        with Span("speech_input"):
+            time.sleep(float(entry.get("delay", 0)))
+        return RunQuery(entry["query"], orchestrator, speak=speech, speculate=speculate, dry_run=False)
+
+
+def Run(corpus, repeat=1, concurrency=1, speech=True, speculate=False, verbose=False, timing=None):
+    from Backend import Tracing
+    from Backend.DecisionCache import NormalizeQuery
+    from Backend.TaskOrchestrator import TaskOrchestrator
+    from Backend.Pipeline import Limits
+
+    timing = timing or {}
+    chat = FakeTiming(timing.get("first_token", 0.3), timing.get("tokens_per_second", 40.0))
+    decide = FakeTiming(timing.get("decision_first_token", 0.25), timing.get("tokens_per_second", 40.0) * 2)
+    decisions = {NormalizeQuery(e["query"]): e["decision"] for e in corpus if "decision" in e}
+
+    with tempfile.TemporaryDirectory() as directory:
+        InstallFakes(directory, chat, chat, decide, decisions)
+        Tracing.Traces = Tracing.Tracer(path=None, enabled=True)
+        orchestrator = TaskOrchestrator(workers=max(4, 4 * concurrency), limits=Limits)
+
+        jobs = [entry for _ in range(repeat) for entry in corpus]
+        pending = list(reversed(jobs))
+        lock = threading.Lock()
+
+        def worker():
+            while True:
+                with lock:
+                    if not pending:
+                        return
+                    entry = pending.pop()
+                ExecuteQuery(entry, orchestrator, speech=speech, speculate=speculate)
+
+        output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        start = time.perf_counter()
+        with output:
+            threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        elapsed = time.perf_counter() - start
+
+        print(Tracing.FormatSummary(Tracing.TraceStats()))
+        print(f"{len(jobs)} queries in {elapsed:.2f} s, {len(jobs) / elapsed:.2f} queries/second "
+              f"(concurrency {concurrency}, speech {'on' if speech else 'off'}, "
+              f"speculation {'on' if speculate else 'off'})")
+        return Tracing.TraceStats()
+
+
+def Main():
+    parser = argparse.ArgumentParser(description="Benchmark the assistant pipeline against local stand-in providers.")
+    parser.add_argument("--queries", help="corpus file (text lines or JSONL); a built-in corpus is used by default")
+    parser.add_argument("--repeat", type=int, default=1, help="times to run the corpus")
+    parser.add_argument("--concurrency", type=int, default=1, help="queries in flight at once")
+    parser.add_argument("--first-token", type=float, default=0.3, help="answer model time to first token (s)")
+    parser.add_argument("--decision-first-token", type=float, default=0.25, help="decision model time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=40.0, help="answer model streaming rate")
+    parser.add_argument("--no-speech", action="store_true", help="skip synthesis and playback")
+    parser.add_argument("--speculate", action="store_true", help="start answers speculatively during the decision")
+    parser.add_argument("--verbose", action="store_true", help="show the pipeline's own output")
+    args = parser.parse_args()
+
+    corpus = ReadCorpus(args.queries) if args.queries else DefaultCorpus
+    Run(corpus, repeat=args.repeat, concurrency=args.concurrency, speech=not args.no_speech,
+        speculate=args.speculate, verbose=args.verbose,
+        timing={"first_token": args.first_token, "decision_first_token": args.decision_first_token,
+                "tokens_per_second": args.tokens_per_second})
+
+
+if __name__ == "__main__":
+    Main()
@@ -0,0 +1,150 @@
+# Append-only chat history store.
+#
+# ChatBot and RealtimeSearchEngine used to load the whole Data/ChatLog.json and
+# dump it back on every turn. Messages now live in a SQLite database in WAL
+# mode: appending a turn is a single insert and the last N turns are read
+# through the primary key index without touching older rows. The old JSON log
+# is imported once, the first time the database is opened.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+DatabaseFile = r"Data/ChatLog.db"
+LegacyFile = r"Data/ChatLog.json"
+
+
+class ChatHistoryStore:
+    """Chat messages ({"role", "content"} dicts) stored in insertion order."""
+
+    def __init__(self, path=DatabaseFile, legacy_path=LegacyFile):
+        self.path = path
+        self.generation = 0   # Bumped on clear() so indexes built on top know to rebuild.
+        self.summary_lock = threading.Lock()   # Held while a rolling summary is read, extended and stored.
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, role TEXT NOT NULL, content TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS summaries (name TEXT PRIMARY KEY, content TEXT NOT NULL, upto INTEGER NOT NULL)"
+        )
+        if legacy_path:
+            self._migrate(legacy_path)
+
+    # Run the statements of the with block as one transaction, rolled back if
+    # any of them fails. The caller holds self._lock.
+    @contextmanager
+    def _transaction(self):
+        self._db.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    # Import the old whole-file JSON log once.
+    def _migrate(self, legacy_path):
+        with self._lock:
+            done = self._db.execute("SELECT value FROM meta WHERE key = 'migrated'").fetchone()
+            if done:
+                return
+
+            try:
+                with open(legacy_path, "r", encoding="utf-8") as f:
+                    legacy = json.load(f)
+            except (FileNotFoundError, ValueError):
+                legacy = []
+
+            now = time.time()
+            rows = [(m["role"], m["content"], now) for m in legacy if "role" in m and "content" in m]
+            with self._transaction():
+                self._db.executemany("INSERT INTO messages (role, content, created) VALUES (?, ?, ?)", rows)
+                self._db.execute("INSERT INTO meta (key, value) VALUES ('migrated', ?)", (legacy_path,))
+
+    def append(self, role, content):
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO messages (role, content, created) VALUES (?, ?, ?)", (role, content, time.time())
+            )
+            return cursor.lastrowid
+
+    # Append several messages in one transaction (e.g. a user turn and its answer).
+    def extend(self, messages):
+        now = time.time()
+        rows = [(m["role"], m["content"], now) for m in messages]
+        with self._lock, self._transaction():
+            self._db.executemany("INSERT INTO messages (role, content, created) VALUES (?, ?, ?)", rows)
+
+    # The last n messages, oldest first.
+    def last(self, n):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT role, content FROM messages ORDER BY id DESC LIMIT ?", (n,)
+            ).fetchall()
+        return [{"role": role, "content": content} for role, content in reversed(rows)]
+
+    def all(self):
+        with self._lock:
+            rows = self._db.execute("SELECT role, content FROM messages ORDER BY id").fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    # Raw (id, role, content) rows with after < id < before, oldest first.
+    def rows(self, after=0, before=None, limit=None):
+        query = "SELECT id, role, content FROM messages WHERE id > ?"
+        params = [after]
+        if before is not None:
+            query += " AND id < ?"
+            params.append(before)
+        query += " ORDER BY id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return self._db.execute(query, params).fetchall()
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    # Total characters and number of messages, without loading them.
+    def size(self):
+        with self._lock:
+            chars, count = self._db.execute("SELECT COALESCE(SUM(LENGTH(content)), 0), COUNT(*) FROM messages").fetchone()
+        return chars, count
+
+    # Rolling summary stored under a name, as (text, id of the last folded message).
+    def summary(self, name):
+        with self._lock:
+            row = self._db.execute("SELECT content, upto FROM summaries WHERE name = ?", (name,)).fetchone()
+        return row if row else ("", 0)
+
+    def set_summary(self, name, content, upto):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO summaries (name, content, upto) VALUES (?, ?, ?)", (name, content, upto)
+            )
+
+    def clear(self):
+        with self._lock:
+            with self._transaction():
+                self._db.execute("DELETE FROM messages")
+                self._db.execute("DELETE FROM summaries")
+            self.generation += 1
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# Shared store used by ChatBot, RealtimeSearchEngine and Main.py.
+History = ChatHistoryStore()
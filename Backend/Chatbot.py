@@ -2,10 +2,13 @@
 
 # Chatbot.py
 
-from google import genai
-from json import load, dump
 import datetime
+import threading
+import time
 from dotenv import dotenv_values
+from Backend.ChatHistory import History
+from Backend.ContextWindow import BuildContext, EstimateTokens
+from Backend.Tracing import Record
 
 # Load environment variables
 env_vars = dotenv_values(".env")
@@ -13,8 +16,17 @@ Username = env_vars.get("Username")
 Assistantname = env_vars.get("Assistantname")
 GeminiAPIKey = env_vars.get("GeminiAPIKey")
 
-# Initialize Gemini client
-client = genai.Client(api_key=GeminiAPIKey)
+# Gemini client, created on first use so the SDK is not imported at startup
+client = None
+_client_lock = threading.Lock()
+
+def GetClient():
+    global client
+    with _client_lock:
+        if client is None:
+            from google import genai
+            client = genai.Client(api_key=GeminiAPIKey)
+        return client
 
 # System instruction
 SystemPrompt = f"""
@@ -39,6 +51,22 @@ def RealtimeInformation():
     )
 
 
+# Shown when generation fails; the chat log is reset at the same time.
+ErrorAnswer = "An error occurred. I reset the conversation."
+
+
+# Store a finished exchange in the chat log, or reset the log if it failed.
+def CommitExchange(Query, Answer, store=None):
+    store = store or History
+    if Answer == ErrorAnswer:
+        store.clear()
+    else:
+        store.extend([
+            {"role": "user", "content": Query},
+            {"role": "assistant", "content": Answer}
+        ])
+
+
 # Clean AI output
 def AnswerModifier(text):
     lines = text.split("\n")
@@ -46,16 +74,21 @@ def AnswerModifier(text):
     return "\n".join(non_empty)
 
 
-# 🤖 MAIN CHATBOT FUNCTION
-def ChatBot(Query):
+# 🤖 STREAMING CHATBOT FUNCTION
+# Yields the answer chunk by chunk as Gemini produces it.
+# With persist=False the chat log is left untouched (speculative answers);
+# call CommitExchange() to keep the result. store defaults to the shared History.
+def ChatBotStream(Query, persist=True, store=None):
+    store = store or History
 
     try:
-        # Load existing log
-        try:
-            with open(r"Data/ChatLog.json", "r") as f:
-                messages = load(f)
-        except FileNotFoundError:
-            messages = []
+        Information = RealtimeInformation()
+
+        # Load the recent and relevant turns that fit the Gemini token budget
+        Background, messages = BuildContext(
+            store, "gemini", query=Query,
+            reserved=EstimateTokens(SystemPrompt) + EstimateTokens(Information) + EstimateTokens(Query)
+        )
 
         # Add user message
         messages.append({"role": "user", "content": Query})
@@ -74,9 +107,16 @@ def ChatBot(Query):
         # Real-time info also as user role
         gemini_messages.append({
             "role": "user",
-            "parts": [{"text": RealtimeInformation()}]
+            "parts": [{"text": Information}]
         })
 
+        # Summary and relevant parts of older turns, also as user role
+        if Background:
+            gemini_messages.append({
+                "role": "user",
+                "parts": [{"text": f"Context from our earlier conversation:\n{Background}"}]
+            })
+
         # Convert stored messages to valid Gemini roles
         for msg in messages:
             # Gemini only accepts "user" and "model"
@@ -90,7 +130,8 @@ def ChatBot(Query):
         # --------------------------------------
         # 🔥 SEND REQUEST TO GEMINI (STREAMING)
         # --------------------------------------
-        completion = client.models.generate_content_stream(
+        Started = time.perf_counter()
+        completion = GetClient().models.generate_content_stream(
             model="gemini-2.5-flash",
             contents=gemini_messages,
             
@@ -101,27 +142,31 @@ def ChatBot(Query):
         # Streaming output
         for chunk in completion:
             if hasattr(chunk, "text") and chunk.text:
-                Answer += chunk.text
-
-        Answer = Answer.replace("</s>", "")
-
-        # Add model reply to the log
-        messages.append({"role": "assistant", "content": Answer})
+                text = chunk.text.replace("</s>", "")
+                if not Answer:
+                    Record("llm_first_token", time.perf_counter() - Started, provider="gemini")
+                Answer += text
+                yield text
 
-        # Save updated chat log
-        with open(r"Data/ChatLog.json", "w") as f:
-            dump(messages, f, indent=4)
+        Record("llm_complete", time.perf_counter() - Started, provider="gemini", chars=len(Answer))
 
-        return AnswerModifier(Answer)
+        # Append the user message and model reply to the log
+        if persist:
+            CommitExchange(Query, Answer, store)
 
     except Exception as e:
         print("Error:", e)
 
         # Reset log if something breaks
-        with open(r"Data/ChatLog.json", "w") as f:
-            dump([], f)
+        if persist:
+            store.clear()
 
-        return "An error occurred. I reset the conversation."
+        yield ErrorAnswer
+
+
+# 🤖 MAIN CHATBOT FUNCTION
+def ChatBot(Query):
+    return AnswerModifier("".join(ChatBotStream(Query)))
 
 
 # ---------------------------
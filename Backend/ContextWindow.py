@@ -0,0 +1,157 @@
+# Token-budgeted context windows for the Gemini and Groq calls.
+#
+# Instead of sending the whole chat history on every request, the last few
+# turns are kept verbatim up to a per-provider token budget and older turns are
+# folded into a rolling summary. The summary is updated incrementally (only
+# newly evicted turns are folded in) and stored next to the history, so each
+# call only reads the turns that have not been summarized yet. Older exchanges
+# relevant to the current query are pulled back in through the BM25 index.
+
+import re
+from collections import deque
+from dotenv import dotenv_values
+from Backend.HistoryIndex import IndexFor
+
+env_vars = dotenv_values(".env")
+
+# Prompt token budgets per provider, configurable from .env.
+Budgets = {
+    "gemini": int(env_vars.get("GeminiContextTokens") or 6000),
+    "groq": int(env_vars.get("GroqContextTokens") or 4000),
+}
+
+# Messages at the end of the history that are always candidates for the verbatim window.
+RecentMessages = int(env_vars.get("ContextRecentMessages") or 6)
+
+# Older exchanges retrieved by relevance to the query.
+RetrievedExchanges = int(env_vars.get("ContextRetrievedExchanges") or 3)
+
+# Share of the budget the rolling summary and the retrieved exchanges may take.
+SummaryShare = 0.25
+RetrievalShare = 0.25
+
+# Longest text a single retrieved exchange may add.
+ExchangeChars = 600
+
+# Longest line a single folded turn may add to the summary.
+SummaryLineChars = 200
+
+# Recent (provider, tokens before, tokens after, turns kept, turns folded) measurements.
+ContextStats = deque(maxlen=200)
+
+
+# Rough token count: about four characters per token plus per-message overhead.
+def EstimateTokens(text):
+    return len(str(text)) // 4 + 4
+
+
+# Condense a turn to its first sentence for the summary.
+def CondenseTurn(role, content):
+    speaker = "User" if role == "user" else "Assistant"
+    text = " ".join(str(content).split())
+    first = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0]
+    if len(first) > SummaryLineChars:
+        first = first[:SummaryLineChars].rstrip() + "..."
+    return f"{speaker}: {first}"
+
+
+# Fold newly evicted rows into the summary and trim it to limit tokens.
+def FoldSummary(summary, rows, limit):
+    lines = summary.splitlines() if summary else []
+    lines += [CondenseTurn(role, content) for _, role, content in rows]
+
+    total = sum(EstimateTokens(line) for line in lines)
+    while lines and total > limit:
+        total -= EstimateTokens(lines.pop(0))
+
+    return "\n".join(lines)
+
+
+# Older exchanges relevant to the query, formatted and trimmed to limit tokens.
+def RelevantExchanges(store, query, before, limit):
+    exchanges = []
+    used = 0
+    for _, user, assistant in IndexFor(store).search(query, k=RetrievedExchanges, before=before):
+        text = f"User: {user}\nAssistant: {assistant}"
+        if len(text) > ExchangeChars:
+            text = text[:ExchangeChars].rstrip() + "..."
+        cost = EstimateTokens(text)
+        if used + cost > limit:
+            continue
+        exchanges.append(text)
+        used += cost
+    return exchanges
+
+
+def BuildContext(store, provider, query=None, reserved=0):
+    """
+    Return (background, messages) for a provider. messages are the last few
+    turns that fit the budget after `reserved` tokens (system prompt, query,
+    search results) are set aside; background holds the rolling summary of
+    older turns and the older exchanges most relevant to `query`.
+    """
+    budget = Budgets[provider]
+
+    # One fold at a time per store: concurrent answers would otherwise read the
+    # same summary and each write back their own extension of it.
+    with store.summary_lock:
+        summary, upto = store.summary(provider)
+        rows = store.rows(after=upto)
+
+        summary_limit = int(budget * SummaryShare)
+        retrieval_limit = int(budget * RetrievalShare) if query else 0
+        folded = 0
+
+        while True:
+            available = budget - reserved - retrieval_limit - (EstimateTokens(summary) if summary else 0)
+
+            # Walk backwards keeping the last few turns while they fit.
+            start = len(rows)
+            used = 0
+            while start > 0 and len(rows) - start < RecentMessages:
+                cost = EstimateTokens(rows[start - 1][2])
+                if used + cost > available:
+                    break
+                used += cost
+                start -= 1
+
+            # A user turn without its answer (or vice versa) confuses the models,
+            # so never start the window on an assistant message.
+            while start < len(rows) and rows[start][1] != "user":
+                start += 1
+
+            if start == 0:
+                break
+
+            # Fold the evicted turns into the summary and retry with the new summary size.
+            evicted, rows = rows[:start], rows[start:]
+            summary = FoldSummary(summary, evicted, summary_limit)
+            upto = evicted[-1][0]
+            folded += len(evicted)
+
+        if folded:
+            store.set_summary(provider, summary, upto)
+
+    messages = [{"role": role, "content": content} for _, role, content in rows]
+
+    background = []
+    if summary:
+        background.append(f"Summary:\n{summary}")
+    if query:
+        exchanges = RelevantExchanges(store, query, rows[0][0] if rows else None, retrieval_limit)
+        if exchanges:
+            background.append("Relevant earlier exchanges:\n" + "\n\n".join(exchanges))
+    background = "\n\n".join(background)
+
+    chars, count = store.size()
+    before = chars // 4 + 4 * count + reserved
+    after = sum(EstimateTokens(m["content"]) for m in messages) + reserved
+    if background:
+        after += EstimateTokens(background)
+
+    ContextStats.append({
+        "provider": provider, "before": before, "after": after, "kept": len(messages), "folded": folded
+    })
+    print(f"[context] {provider}: {before} -> {after} prompt tokens ({len(messages)} turns kept, {folded} folded)")
+
+    return background, messages
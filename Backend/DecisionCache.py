@@ -0,0 +1,164 @@
+# Persistent cache of FirstLayerDMM decisions.
+#
+# Users repeat the same phrasings all the time, so decisions returned by Cohere
+# are remembered under a normalized form of the query. The cache is LRU-bounded,
+# every entry expires after a per-category TTL, and it is mirrored to
+# Data/DecisionCache.json so it survives restarts.
+#
+# The LRU/TTL bookkeeping lives in TTLCache, which WebSearch also uses for
+# search results.
+
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+CacheFile = r"Data/DecisionCache.json"
+MaxEntries = 512
+
+# Seconds a decision stays valid, by category. A decision lives as long as
+# its shortest-lived task, so anything containing a realtime task expires quickly.
+CategoryTTL = {
+    "realtime": 5 * 60,
+    "general": 7 * 24 * 3600,
+    "exit": 30 * 24 * 3600,
+    "reminder": 60 * 60,
+}
+DefaultTTL = 24 * 3600
+
+
+# Normalize a query the same way for every lookup: case-folded, punctuation
+# removed and whitespace collapsed (an aggressive QueryModifier).
+def NormalizeQuery(query):
+    text = str(query).casefold()
+    text = re.sub(r"[^\w\s']", " ", text)
+    return " ".join(text.split())
+
+
+# Time to live of a whole decision list.
+def DecisionTTL(decision):
+    ttl = DefaultTTL
+    for task in decision:
+        for category, seconds in CategoryTTL.items():
+            if task.startswith(category):
+                ttl = min(ttl, seconds)
+    return ttl
+
+
+class TTLCache:
+    """LRU cache of normalized query -> value, each entry valid for ttl seconds."""
+
+    field = "value"                      # Name of the value inside an entry.
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self, ttl, max_entries=MaxEntries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()   # key -> {field: value, "expires": float}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, query):
+        key = NormalizeQuery(query)
+        with self._lock:
+            entry = self.entries.get(key)
+
+            if entry is None or entry["expires"] <= self.clock():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[self.field]
+
+    # Store value for ttl seconds (the cache's own ttl by default).
+    def put(self, query, value, ttl=None):
+        key = NormalizeQuery(query)
+        if not key or not value:
+            return
+
+        with self._lock:
+            self.entries[key] = {self.field: value, "expires": self.clock() + (self.ttl if ttl is None else ttl)}
+            self.entries.move_to_end(key)
+            self._trim()
+            self._changed()
+
+    def _trim(self):
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    # Called with the lock held whenever entries were added or removed.
+    def _changed(self):
+        pass
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self._changed()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class DecisionCache(TTLCache):
+    """LRU cache of query -> decision list with per-decision TTL and a JSON backing file."""
+
+    field = "decision"
+    clock = staticmethod(time.time)   # Expiry times are saved, so they must hold across restarts.
+
+    def __init__(self, path=CacheFile, max_entries=MaxEntries):
+        super().__init__(DefaultTTL, max_entries)
+        self.path = path
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+
+        now = time.time()
+        for key, entry in data.items():
+            if entry.get("expires", 0) > now:
+                self.entries[key] = entry
+
+        self._trim()
+
+    def _save(self):
+        # Write to a temporary file first so a crash never leaves a half-written cache.
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(temp_path, self.path)
+
+    def _changed(self):
+        try:
+            self._save()
+        except OSError as e:
+            print(f"Error saving decision cache: {e}")
+
+    def get(self, query):
+        decision = super().get(query)
+        return list(decision) if decision is not None else None
+
+    def put(self, query, decision):
+        if decision:
+            super().put(query, list(decision), ttl=DecisionTTL(decision))
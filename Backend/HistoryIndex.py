@@ -0,0 +1,175 @@
+# BM25 retrieval over past chat exchanges.
+#
+# Long sessions accumulate hundreds of turns, most of them irrelevant to the
+# current query. The index keeps one document per exchange (a user message and
+# the answer that followed it) and is brought up to date incrementally by
+# reading only the rows appended since the last sync.
+#
+# Usage:
+#   python -m Backend.HistoryIndex   # benchmark over a synthetic 10k-turn log
+
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+StopWords = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "to", "of", "and", "or", "in", "on", "at", "for",
+    "with", "about", "what", "whats", "what's", "who", "how", "why", "when", "where", "which", "do", "does",
+    "did", "i", "you", "me", "my", "your", "he", "she", "it", "his", "her", "its", "they", "them", "this",
+    "that", "tell", "can", "could", "please", "so", "it's", "im", "i'm"
+}
+
+
+def Tokenize(text):
+    return [w for w in re.findall(r"[\w']+", str(text).lower()) if w not in StopWords]
+
+
+class HistoryIndex:
+    """Incrementally updated BM25 index over the exchanges of a ChatHistoryStore."""
+
+    def __init__(self, store, k1=1.5, b=0.75):
+        self.store = store
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.postings = defaultdict(dict)   # term -> {doc id: term frequency}
+        self.lengths = {}                   # doc id -> number of terms
+        self.documents = {}                 # doc id -> (user text, assistant text)
+        self.total_length = 0
+        self.last_id = 0
+        self.generation = self.store.generation
+        self._pending = None                # user row still waiting for its answer
+
+    # Index every row appended since the last sync.
+    def sync(self):
+        with self._lock:
+            if self.generation != self.store.generation:
+                self._reset()
+            for row_id, role, content in self.store.rows(after=self.last_id):
+                self.last_id = row_id
+                if role == "user":
+                    if self._pending:
+                        self._add(*self._pending, "")
+                    self._pending = (row_id, content)
+                elif self._pending:
+                    self._add(*self._pending, content)
+                    self._pending = None
+
+    def _add(self, doc_id, user, assistant):
+        terms = Counter(Tokenize(user) + Tokenize(assistant))
+        for term, frequency in terms.items():
+            self.postings[term][doc_id] = frequency
+        length = sum(terms.values())
+        self.lengths[doc_id] = length
+        self.documents[doc_id] = (user, assistant)
+        self.total_length += length
+
+    # Top-k exchanges for a query among documents with id < before, oldest first.
+    def search(self, query, k=3, before=None):
+        self.sync()
+        with self._lock:
+            count = len(self.lengths)
+            if not count:
+                return []
+            average = self.total_length / count
+
+            scores = defaultdict(float)
+            for term in set(Tokenize(query)):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    if before is not None and doc_id >= before:
+                        continue
+                    norm = frequency + self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / average)
+                    scores[doc_id] += idf * frequency * (self.k1 + 1) / norm
+
+            best = sorted(scores, key=scores.get, reverse=True)[:k]
+            return [(doc_id, *self.documents[doc_id]) for doc_id in sorted(best)]
+
+
+# One index per history store, created on first use.
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def IndexFor(store):
+    with _indexes_lock:
+        index = _indexes.get(store.path)
+        if index is None or index.store is not store:
+            index = _indexes[store.path] = HistoryIndex(store)
+        return index
+
+
+# Forget the index of a store that is being closed.
+def DropIndex(store):
+    with _indexes_lock:
+        if getattr(_indexes.get(store.path), "store", None) is store:
+            del _indexes[store.path]
+
+
+def Benchmark(turns=10000, queries=200):
+    import os
+    import random
+    import tempfile
+    import time
+    from Backend.ChatHistory import ChatHistoryStore
+    from Backend.ContextWindow import BuildContext, EstimateTokens
+
+    rng = random.Random(0)
+    topics = ["python", "cricket", "cooking", "physics", "history", "music", "travel", "finance",
+              "football", "chemistry", "movies", "gardening", "astronomy", "painting", "cars", "fitness"]
+    subjects = ["basics", "tips", "history", "latest trends", "common mistakes", "best resources", "examples"]
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = ChatHistoryStore(os.path.join(directory, "bench.db"), None)
+
+        batch = []
+        for i in range(turns // 2):
+            topic, subject = rng.choice(topics), rng.choice(subjects)
+            if i == 123:
+                batch.append({"role": "user", "content": "remember that my dog's name is bruno"})
+                batch.append({"role": "assistant", "content": "Got it, your dog's name is Bruno."})
+                continue
+            batch.append({"role": "user", "content": f"tell me about {topic} {subject} number {i}"})
+            batch.append({"role": "assistant", "content": f"Here is something about {topic} {subject}. " * 4})
+        store.extend(batch)
+
+        full_tokens = sum(EstimateTokens(m["content"]) for m in store.all())
+
+        index = IndexFor(store)
+        start = time.perf_counter()
+        index.sync()
+        build = time.perf_counter() - start
+
+        latencies = []
+        for _ in range(queries):
+            query = f"what are the {rng.choice(subjects)} of {rng.choice(topics)}"
+            start = time.perf_counter()
+            index.search(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+
+        hits = index.search("what is my dog's name?")
+        recalled = any("bruno" in user for _, user, _ in hits)
+
+        background, messages = BuildContext(store, "groq", query="what is my dog's name?")
+        windowed = sum(EstimateTokens(m["content"]) for m in messages) + EstimateTokens(background)
+
+        store.close()
+
+    print(f"Turns:                  {turns}")
+    print(f"Index build:            {build * 1000:.1f} ms")
+    print(f"Search latency:         p50 {latencies[len(latencies) // 2]:.2f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95)]:.2f} ms")
+    print(f"Prompt tokens:          {full_tokens} full history -> {windowed} windowed with retrieval")
+    print(f"Planted fact recalled:  {recalled}")
+
+
+if __name__ == "__main__":
+    Benchmark()
@@ -0,0 +1,283 @@
+# Offline intent model trained from logged FirstLayerDMM decisions.
+#
+# Every decision Cohere makes is a free labeled example: (query, category).
+# LogDecision() appends those pairs to Data/DecisionLog.jsonl, TrainIntentModel()
+# fits a multinomial naive Bayes model over hashed word and character n-grams,
+# and the saved model answers locally when it is confident enough.
+#
+# Naive Bayes posteriors are close to 1.0 for almost every query, so they say
+# nothing about how sure the model is. Confidence is instead the per-feature
+# score margin between the two best categories, and the margin needed for a
+# given precision (IntentModelThreshold, e.g. 0.9) is measured on a held-out
+# part of the log at training time. The model only ever answers single
+# "general" or "realtime" queries; anything with a comma, "and", "then" or a
+# task keyword is left to Cohere, and so are goodbyes, which end the program.
+#
+# Usage:
+#   python -m Backend.IntentModel train       # fit and save Data/IntentModel.npz
+#   python -m Backend.IntentModel benchmark   # accuracy vs Cohere labels and latency
+
+import json
+import random
+import re
+import sys
+import time
+import zlib
+import numpy as np
+
+LogFile = r"Data/DecisionLog.jsonl"
+ModelFile = r"Data/IntentModel.npz"
+
+# Size of the hashed feature space.
+Dimensions = 2 ** 16
+
+# Categories whose decision is just "<category> <query>", so the model can
+# produce the full decision. Everything else needs Cohere to extract arguments.
+# "exit" is still learned but never answered locally: a wrong guess quits.
+PassthroughCategories = ("general", "realtime")
+
+# Queries that may hold several tasks or a task with arguments.
+TaskCues = re.compile(
+    r",|\b(?:and|then|also|open|close|play|generate|image|picture|remind|reminder|set|"
+    r"mute|unmute|volume|write|content|search|google|youtube|bye|goodbye|exit|quit)\b"
+)
+
+# Share of the logged examples held out to calibrate the margin, the least
+# number of held-out examples, and the least number of them a margin must
+# have answered to be trusted.
+Holdout = 0.2
+MinCalibration = 20
+MinAnswered = 10
+
+Categories = [
+    "exit", "general", "realtime", "open", "close", "play", "generate image",
+    "system", "content", "google search", "youtube search", "reminder"
+]
+
+
+# Append one (query, decision) pair to the decision log.
+def LogDecision(query, decision, path=LogFile):
+    if not decision:
+        return
+    try:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"query": query, "decision": list(decision), "time": time.time()}) + "\n")
+    except OSError as e:
+        print(f"Error logging decision: {e}")
+
+
+# Read (query, category) training pairs. Only single-task decisions carry an
+# unambiguous label, so compound decisions are skipped.
+def ReadDecisionLog(path=LogFile):
+    examples = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                decision = entry.get("decision") or []
+                if len(decision) != 1:
+                    continue
+                category = TaskCategory(decision[0])
+                if category:
+                    examples.append((entry["query"], category))
+    except FileNotFoundError:
+        pass
+    return examples
+
+
+# Category of a single decision task, e.g. "google search python" -> "google search".
+def TaskCategory(task):
+    matches = [c for c in Categories if task.startswith(c)]
+    return max(matches, key=len) if matches else None
+
+
+# Hashed bag of word unigrams/bigrams and character 3-5 grams.
+def Features(query):
+    text = " ".join(re.findall(r"[\w']+", str(query).lower()))
+    words = text.split()
+
+    grams = [f"w:{w}" for w in words]
+    grams += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+
+    padded = f" {text} "
+    for n in (3, 4, 5):
+        grams += [f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1)]
+
+    return np.array([zlib.crc32(g.encode("utf-8")) % Dimensions for g in grams], dtype=np.int64)
+
+
+class IntentModel:
+    """Multinomial naive Bayes over hashed n-gram features, with a held-out margin calibration."""
+
+    def __init__(self, classes, log_prior, log_likelihood, calibration=None):
+        self.classes = list(classes)
+        self.log_prior = log_prior
+        self.log_likelihood = log_likelihood
+        # Held-out (margin, correct) pairs of passthrough predictions.
+        self.calibration = np.zeros((0, 2), dtype=np.float64) if calibration is None else calibration
+        self._margins = {}
+
+    @classmethod
+    def fit(cls, examples, alpha=0.1):
+        model = cls.train(examples, alpha)
+        model.calibration = Calibrate(examples, alpha)
+        return model
+
+    @classmethod
+    def train(cls, examples, alpha=0.1):
+        classes = sorted({category for _, category in examples})
+        index = {c: i for i, c in enumerate(classes)}
+
+        counts = np.zeros((len(classes), Dimensions), dtype=np.float64)
+        priors = np.zeros(len(classes), dtype=np.float64)
+
+        for query, category in examples:
+            row = index[category]
+            np.add.at(counts[row], Features(query), 1.0)
+            priors[row] += 1
+
+        counts += alpha
+        log_likelihood = np.log(counts) - np.log(counts.sum(axis=1, keepdims=True))
+        log_prior = np.log(priors / priors.sum())
+        return cls(classes, log_prior, log_likelihood.astype(np.float32))
+
+    # Return (category, margin) for a query: the score lead of the best
+    # category over the runner-up per feature, 0.0 with a single category.
+    def predict(self, query):
+        features = Features(query)
+        scores = self.log_prior + self.log_likelihood[:, features].sum(axis=1)
+        order = np.argsort(scores)[::-1]
+        best = int(order[0])
+        if len(order) < 2 or not len(features):
+            return self.classes[best], 0.0
+        return self.classes[best], float(scores[best] - scores[order[1]]) / len(features)
+
+    # Smallest margin at which held-out predictions were right at least
+    # precision of the time, or infinity if no margin was good enough.
+    def min_margin(self, precision):
+        if precision not in self._margins:
+            self._margins[precision] = MinMargin(self.calibration, precision)
+        return self._margins[precision]
+
+    def save(self, path=ModelFile):
+        np.savez_compressed(path, classes=np.array(self.classes), log_prior=self.log_prior,
+                            log_likelihood=self.log_likelihood, calibration=self.calibration)
+
+    @classmethod
+    def load(cls, path=ModelFile):
+        with np.load(path) as data:
+            # Models saved before calibration have none and never answer.
+            calibration = data["calibration"] if "calibration" in data.files else None
+            return cls([str(c) for c in data["classes"]], data["log_prior"], data["log_likelihood"], calibration)
+
+
+# Held-out (margin, correct) pairs of the passthrough predictions of a model
+# trained on the rest of the examples.
+def Calibrate(examples, alpha=0.1, holdout=Holdout):
+    examples = list(examples)
+    random.Random(0).shuffle(examples)
+    split = int(len(examples) * (1 - holdout))
+    train, test = examples[:split], examples[split:]
+    if len(test) < MinCalibration or len({category for _, category in train}) < 2:
+        return np.zeros((0, 2), dtype=np.float64)
+
+    model = IntentModel.train(train, alpha)
+    pairs = []
+    for query, label in test:
+        category, margin = model.predict(query)
+        if category in PassthroughCategories:
+            pairs.append((margin, category == label))
+    return np.array(pairs, dtype=np.float64).reshape(-1, 2)
+
+
+def MinMargin(calibration, precision):
+    order = np.argsort(calibration[:, 0])[::-1]
+    margins = calibration[order, 0]
+    precisions = np.cumsum(calibration[order, 1]) / np.arange(1, len(margins) + 1)
+    good = np.nonzero(precisions >= precision)[0]
+    if not len(good) or good[-1] + 1 < MinAnswered:
+        return float("inf")
+    return float(margins[good[-1]])
+
+
+def TrainIntentModel(log_path=LogFile, model_path=ModelFile):
+    examples = ReadDecisionLog(log_path)
+    if not examples:
+        print("No logged decisions to train on.")
+        return None
+    model = IntentModel.fit(examples)
+    model.save(model_path)
+    print(f"Trained intent model on {len(examples)} decisions ({', '.join(model.classes)}), "
+          f"{len(model.calibration)} held out for calibration.")
+    return model
+
+
+# Load the saved model, or None when it has not been trained yet.
+def LoadIntentModel(path=ModelFile):
+    try:
+        return IntentModel.load(path)
+    except (FileNotFoundError, OSError, KeyError, ValueError):
+        return None
+
+
+# Full decision list from the model, or None when Cohere should decide.
+# threshold is the held-out precision the answer has to reach.
+def PredictDecision(model, query, threshold=0.9):
+    query = str(query).strip()
+    if model is None or len(model.classes) < 2 or not query:
+        return None
+    if TaskCues.search(query.lower()):
+        return None
+    category, margin = model.predict(query)
+    if category not in PassthroughCategories or margin < model.min_margin(threshold):
+        return None
+    return [f"{category} {query}"]
+
+
+def Benchmark(log_path=LogFile, threshold=0.9, holdout=0.2):
+    examples = ReadDecisionLog(log_path)
+    if len(examples) < 10:
+        print("Need at least 10 logged single-task decisions to benchmark.")
+        return
+
+    random.Random(0).shuffle(examples)
+    split = int(len(examples) * (1 - holdout))
+    train, test = examples[:split], examples[split:]
+
+    start = time.perf_counter()
+    model = IntentModel.fit(train)
+    train_time = time.perf_counter() - start
+
+    correct = answered = answered_correct = 0
+    latencies = []
+    for query, label in test:
+        start = time.perf_counter()
+        category, _ = model.predict(query)
+        decision = PredictDecision(model, query, threshold)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        correct += category == label
+        if decision:
+            answered += 1
+            answered_correct += category == label
+
+    latencies.sort()
+    print(f"Examples:           {len(train)} train / {len(test)} test")
+    print(f"Training time:      {train_time * 1000:.1f} ms")
+    print(f"Accuracy:           {correct / len(test):.1%} (vs Cohere labels)")
+    print(f"Answered locally:   {answered / len(test):.1%} at threshold {threshold}")
+    if answered:
+        print(f"Local accuracy:     {answered_correct / answered:.1%}")
+    print(f"Latency per query:  mean {sum(latencies) / len(latencies):.3f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.3f} ms")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "train"
+    if command == "benchmark":
+        Benchmark()
+    else:
+        TrainIntentModel()
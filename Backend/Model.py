@@ -1,18 +1,53 @@
-import cohere 
 from rich import print
 from dotenv import dotenv_values
 import os
+import re
+import threading
+from collections import deque
+from Backend.DecisionCache import DecisionCache
 
 env_vars = dotenv_values(".env")
 CohereAPIKey = env_vars.get("CohereAPIKey")
 
-co = cohere.Client(api_key= CohereAPIKey)
+# Cohere client, created on first use so the SDK is not imported at startup.
+co = None
+_co_lock = threading.Lock()
+
+def GetCohere():
+    global co
+    with _co_lock:
+        if co is None:
+            import cohere
+            co = cohere.Client(api_key= CohereAPIKey)
+        return co
+
 funcs = [
     "exit","general","realtime","open","close","play"
     , "generate image" , "system","content","google search","youtube search","reminder"
 
 ]
-messages = []
+# Recent queries sent to the decision model (the default decision context).
+messages = deque(maxlen=100)
+
+# Decisions already made by Cohere for a (normalized) query.
+Cache = DecisionCache()
+
+# Offline intent model trained from logged decisions (None until trained).
+# Loaded on first use because it pulls in numpy.
+OfflineModel = None
+_offline_loaded = False
+_offline_lock = threading.Lock()
+
+def GetOfflineModel():
+    global OfflineModel, _offline_loaded
+    with _offline_lock:
+        if not _offline_loaded:
+            from Backend.IntentModel import LoadIntentModel
+            OfflineModel = LoadIntentModel()
+            _offline_loaded = True
+        return OfflineModel
+
+IntentThreshold = float(env_vars.get("IntentModelThreshold") or 0.9)
 
 preamble = """
 You are a very accurate Decision-Making Model, which decides what kind of a query is given to you.
@@ -54,14 +89,222 @@ ChatHistory = [
     {"role": "User", "message": "chat with me."},
     {"role": "Chatbot", "message": "general chat with me."}
 ]
-def FirstLayerDMM(prompt: str = "test"):
+
+# -------------------------------------------------------------
+# LOCAL FAST PATH
+# Command-style queries ("open chrome", "volume up", "bye") are decided
+# locally with a word trie over the funcs list plus a few compiled patterns.
+# Anything the fast path is not sure about returns None and goes to Cohere.
+# -------------------------------------------------------------
+
+# Categories the fast path is allowed to decide on its own.
+FastPathFuncs = ["exit", "open", "close", "play", "system", "google search", "youtube search"]
+
+# Commands understood by Automation.System.
+SystemCommands = ["mute", "unmute", "volume up", "volume down"]
+
+# Words that make a bare clause look like a new request rather than another app name.
+AmbiguousWords = {
+    "tell", "what", "whats", "what's", "who", "how", "why", "when", "where", "is", "are",
+    "can", "could", "write", "show", "give", "me", "my", "set", "remind", "reminder",
+    "generate", "search", "then", "also", "about", "do", "please"
+}
+
+# Arguments that refer back to earlier context and need the full model.
+ContextArguments = {"it", "that", "this", "them", "file", "those", "these"}
+
+# Longer arguments are more likely a sentence than an app or song name.
+MaxArgumentWords = 4
+
+# Clauses are split on "and", "then" and "and then"; the separator is kept.
+ClauseSeparator = re.compile(r"\s+((?:and\s+)?then|and)\s+")
+
+# Leading fillers stripped before matching, e.g. "hey jarvis, can you open chrome".
+FillerPattern = re.compile(r"^(?:(?:hey|ok|okay)[,\s]+)?(?:jarvis[,\s]+)?(?:(?:please|can you|could you|would you|will you)\s+)*")
+
+FastPathPatterns = [
+    (re.compile(r"^(?:search|look up|find)\s+(?P<topic>.+?)\s+on\s+(?P<site>google|youtube)$"),
+     lambda m: f"{m['site']} search {m['topic']}"),
+    (re.compile(r"^(?:search\s+)?google\s+for\s+(?P<topic>.+)$"),
+     lambda m: f"google search {m['topic']}"),
+    (re.compile(r"^(?:search\s+)?youtube\s+for\s+(?P<topic>.+)$"),
+     lambda m: f"youtube search {m['topic']}"),
+    (re.compile(r"^play\s+(?P<song>.+?)(?:\s+on\s+youtube)?$"),
+     lambda m: f"play {m['song']}"),
+    (re.compile(r"^(?:(?:turn|set)\s+(?:the\s+)?volume\s+up|(?:increase|raise)\s+(?:the\s+)?volume|volume\s+up)$"),
+     lambda m: "system volume up"),
+    (re.compile(r"^(?:(?:turn|set)\s+(?:the\s+)?volume\s+down|(?:decrease|lower|reduce)\s+(?:the\s+)?volume|volume\s+down)$"),
+     lambda m: "system volume down"),
+    (re.compile(r"^(?P<cmd>mute|unmute)(?:\s+(?:the\s+)?(?:volume|sound|system|audio))?$"),
+     lambda m: f"system {m['cmd']}"),
+    (re.compile(r"^(?:(?:ok|okay)\s+)?(?:good\s*bye|bye|exit|quit|see\s+you(?:\s+later)?)(?:\s+(?:jarvis|then|now))?$"),
+     lambda m: "exit"),
+]
+
+
+# Build a word-level trie over the fast path function names.
+def BuildFuncTrie(names):
+    trie = {}
+    for name in names:
+        node = trie
+        for word in name.split():
+            node = node.setdefault(word, {})
+        node[None] = name   # Mark the end of a function name.
+    return trie
+
+FuncTrie = BuildFuncTrie([f for f in FastPathFuncs if f in funcs])
+
+
+# Return (function name, remaining words) for the longest function name the clause starts with.
+def MatchFuncPrefix(words):
+    node = FuncTrie
+    match = None
+    for index, word in enumerate(words):
+        node = node.get(word)
+        if node is None:
+            break
+        if None in node:
+            match = (node[None], words[index + 1:])
+    return match
+
+
+# True if the words look like a bare name ("chrome", "let her go") rather
+# than part of a sentence or a reference to earlier context.
+def LocalArgument(words):
+    if not 0 < len(words) <= MaxArgumentWords:
+        return False
+    return not AmbiguousWords.intersection(words) and not ContextArguments.intersection(words)
+
+
+# Decide a single clause, returning a task string or None.
+def FastPathClause(clause):
+    for pattern, build in FastPathPatterns:
+        m = pattern.match(clause)
+        if m:
+            groups = m.groupdict()
+            if "song" in groups and not LocalArgument(groups["song"].split()):
+                return None
+            if "topic" in groups and ContextArguments.intersection(groups["topic"].split()):
+                return None
+            return build(m)
+
+    match = MatchFuncPrefix(clause.split())
+    if match is None:
+        return None
+
+    func, rest = match
+    argument = " ".join(rest)
+
+    if func == "exit":
+        return "exit" if not rest else None
+    if not LocalArgument(rest):
+        return None
+    if func == "system":
+        return f"system {argument}" if argument in SystemCommands else None
+    return f"{func} {argument}"
+
+
+def FastPathDecision(prompt: str):
+    query = str(prompt).lower().strip()
+    query = re.sub(r"[.!?]+$", "", query).strip()
+    query = FillerPattern.sub("", query).strip()
+    query = re.sub(r"[,\s]*\bplease$", "", query).strip()
+
+    if not query:
+        return None
+
+    decision = []
+
+    for part in query.split(","):
+        part = re.sub(r"^(?:and\s+)?then\s+", "", part.strip())
+        if not part:
+            continue
+
+        pieces = ClauseSeparator.split(part)
+        for separator, piece in zip([None] + pieces[1::2], pieces[0::2]):
+            piece = piece.strip()
+            task = FastPathClause(piece)
+
+            if task is not None:
+                decision.append(task)
+                continue
+
+            if not decision:
+                return None
+
+            previous = decision[-1]
+            words = piece.split()
+
+            # "open chrome and firefox" -> "open chrome, open firefox"
+            if previous.startswith(("open ", "close ")) and LocalArgument(words):
+                decision.append(f"{previous.split()[0]} {piece}")
+
+            # "play rock and roll" -> "play rock and roll", but not
+            # "play believer and what's the weather"
+            elif previous.startswith(("play ", "google search ", "youtube search ")) and separator == "and" \
+                    and LocalArgument(MatchFuncPrefix(previous.split())[1] + words):
+                decision[-1] = f"{previous} and {piece}"
+
+            else:
+                return None
+
+    if not decision:
+        return None
+
+    # An exit mixed with other tasks is unusual enough to leave to the model.
+    if "exit" in decision and len(decision) > 1:
+        return None
+
+    return decision
+
+
+# Strip a raw task and keep it only if it starts with a recognized function keyword.
+def FilterTask(task):
+    task = task.strip()
+    for func in funcs:
+        if task.startswith(func):
+            return task
+    return None
+
+
+# Yield each task of the decision as soon as it is complete, so callers can
+# start working on "open chrome" while Cohere is still writing the rest.
+# on_remote, if given, is called right before the query is sent to Cohere,
+# i.e. only when no local path could decide (used to start speculative work).
+# cache and context default to the shared decision cache and messages; a
+# server session passes its own.
+def FirstLayerDMMStream(prompt: str = "test", on_remote=None, cache=None, context=None):
+    cache = Cache if cache is None else cache
+    context = messages if context is None else context
 
     # Add the user's query to the messages list.
-    messages.append({"role": "user", "content": f"{prompt}"})
+    context.append({"role": "user", "content": f"{prompt}"})
+
+    # Answer command-style queries locally without a Cohere round trip.
+    decision = FastPathDecision(prompt)
+    if decision:
+        yield from decision
+        return
+
+    # Reuse an earlier Cohere decision for the same phrasing.
+    decision = cache.get(prompt)
+    if decision:
+        yield from decision
+        return
+
+    # Let the offline model answer when it is confident enough.
+    from Backend.IntentModel import PredictDecision, LogDecision
+    decision = PredictDecision(GetOfflineModel(), prompt, IntentThreshold)
+    if decision:
+        yield from decision
+        return
 
 
+    if on_remote is not None:
+        on_remote()
+
     # Create a streaming chat session with the Cohere model.
-    stream = co.chat_stream(
+    stream = GetCohere().chat_stream(
         model='command-r-08-2024',        # Specify the Cohere model to use.
         message=prompt,                # Pass the user's query.
         temperature=0.7,               # Set the creativity level of the model.
@@ -71,34 +314,37 @@ def FirstLayerDMM(prompt: str = "test"):
         preamble=preamble              # Pass the detailed instruction preamble.
     )
 
+    # Text received after the last comma, i.e. the task still being generated.
+    pending = ""
+    decision = []
 
-    # Initialize an empty string to store the generated response.
-    response = ""
-
-
-    # Iterate over events in the stream and capture text generation events.
+    # Iterate over events in the stream and emit every task once its comma arrives.
     for event in stream:
         if event.event_type == "text-generation":
-            response += event.text     # Append generated text to the response.
+            pending += event.text.replace("\n", "")
+            *complete, pending = pending.split(",")
 
-# Remove newline characters and split responses into individual tasks.
-    response = response.replace("\n", "")
-    response = response.split(",")
+            for task in complete:
+                task = FilterTask(task)
+                if task:
+                    decision.append(task)
+                    yield task
 
-    # Strip leading and trailing whitespaces from each task.
-    response = [i.strip() for i in response]
+    # The last task has no trailing comma.
+    task = FilterTask(pending)
+    if task:
+        decision.append(task)
+        yield task
 
-    # Initialize an empty list to filter valid tasks.
-    temp = []
+    if "(query)" not in decision:
+        cache.put(prompt, decision)  # Remember the decision for next time.
+        LogDecision(prompt, decision)  # Keep it as training data for the offline model.
 
-    # Filter the tasks based on recognized function keywords.
-    for task in response:
-        for func in funcs:
-            if task.startswith(func):
-                temp.append(task)  # Add valid tasks to the filtered list.
 
-    # Update the response with the filtered list of tasks.
-    response = temp
+def FirstLayerDMM(prompt: str = "test"):
+
+    # Collect the streamed tasks into the usual decision list.
+    response = list(FirstLayerDMMStream(prompt))
 
     # If '(query)' is in the response, recursively call the function for further clarification.
     if "(query)" in response:
@@ -106,6 +352,11 @@ def FirstLayerDMM(prompt: str = "test"):
         return newresponse  # Return the clarified response
     else:
         return response  # Return the final response
+
+
+# Hit/miss counters of the decision cache.
+def DecisionCacheStats():
+    return Cache.stats()
     
 
 if __name__ == "__main__":
@@ -0,0 +1,150 @@
+# The query pipeline without the GUI: decision -> concurrent dispatch -> answers.
+#
+# MainExecution, Headless.py and Backend/Benchmark.py all turn a query into a
+# decision with FirstLayerDMMStream, start every entry on a TaskOrchestrator as
+# soon as it is emitted, and read the answers back in decision order. The
+# shared part lives here; callers decide how answers are shown or spoken.
+#
+# Every general and realtime entry gets its own answer, running concurrently:
+# "general" goes to the chatbot and "realtime" to the search engine. The
+# original MainExecution merged all of them into one RealtimeSearchEngine call
+# instead. Both answers read and fold the same chat log, which
+# ContextWindow.BuildContext serializes per store.
+
+import asyncio
+import time
+from Backend.Model import FirstLayerDMMStream
+from Backend.Chatbot import ChatBotStream
+from Backend.RealtimeSearchEngine import RealtimeSearchEngineStream
+from Backend.Automation import TranslateAndExecute
+from Backend.Speculation import Speculation
+from Backend.Tracing import Span, Record
+
+Functions = ["open", "close", "play", "system", "content", "google search", "youtube search"]
+
+# TaskOrchestrator limits: ImageGeneration.py reads a single request file.
+Limits = {"image": 1}
+
+
+# Same clean-up as the GUI's QueryModifier.
+def CleanQuery(text):
+    return " ".join(str(text or "").split())
+
+
+async def _collect(commands, dry_run):
+    return [result async for result in TranslateAndExecute(commands, dry_run)]
+
+
+# Run one automation command and return what each action reported.
+def RunAutomation(task, dry_run=None):
+    return asyncio.run(_collect([task], dry_run))
+
+
+def SubmitDecisionTask(group, task, guess=None, image=None, dry_run=None, store=None):
+    """
+    Start one decision entry on the task pool. Answers are submitted as
+    streaming tasks, and an answer already started speculatively for the same
+    query is adopted instead. image(prompt) handles image generation; without
+    it those entries are skipped. Returns the task, or None if nothing was started.
+    """
+    if any(task.startswith(func) for func in Functions):
+        return group.submit(task, RunAutomation, task, dry_run, kind="automation")
+
+    if "generate " in task:
+        return group.submit(task, image, task, kind="image") if image is not None else None
+
+    if task.startswith("general "):
+        query = CleanQuery(task.removeprefix("general "))
+        speculative = guess.claim_answer(query) if guess is not None else None
+        if speculative is not None:
+            return group.add(speculative)
+        return group.submit(task, ChatBotStream, query, True, store, kind="general", streams=True)
+
+    if task.startswith("realtime "):
+        query = CleanQuery(task.removeprefix("realtime "))
+
+        # Runs on the worker, where waiting for a speculative search is fine.
+        def stream():
+            results = guess.search_results(query) if guess is not None else None
+            return RealtimeSearchEngineStream(query, results, store)
+
+        return group.submit(task, stream, kind="realtime", streams=True)
+
+    if task.startswith("exit"):
+        return group.submit(task, ChatBotStream, "Okay, Bye!", True, store, kind="general", streams=True)
+
+    return None
+
+
+def Decide(query, orchestrator, guess=None, image=None, dry_run=None, store=None, cache=None, context=None):
+    """
+    Stream the decision for query, starting each entry as it arrives. cache and
+    context are the decision cache and query log (default: the shared ones).
+    Returns (decision, group).
+    """
+    group = orchestrator.group()
+    decision = []
+    on_remote = guess.start if guess is not None else None
+    with Span("decision") as span:
+        for task in FirstLayerDMMStream(query, on_remote=on_remote, cache=cache, context=context):
+            decision.append(task)
+            SubmitDecisionTask(group, task, guess, image, dry_run, store)
+        span["tasks"] = len(decision)
+    if guess is not None:
+        guess.finish(decision)
+    return decision, group
+
+
+def RunQuery(query, orchestrator, speak=False, speculate=None, dry_run=None, image=None, store=None, on_chunk=None,
+             cache=None, context=None):
+    """
+    Run the whole pipeline for one query and return a JSON-ready summary with
+    the decision, every task's outcome and timings in ms. Answers are spoken
+    when speak is True; on_chunk(task, chunk) sees them as they stream.
+    """
+    start = time.perf_counter()
+    options = {} if speculate is None else {"enabled": speculate, "search": speculate}
+    guess = Speculation(orchestrator, CleanQuery(query), store=store, **options)
+    decision, group = Decide(query, orchestrator, guess, image, dry_run, store, cache, context)
+    decided = time.perf_counter()
+
+    first_answer = None
+    for task in group.answers():
+        if speak:
+            from Backend.TextToSpeech import StreamingSpeech
+            speech = StreamingSpeech()
+        for chunk in task.chunks():
+            if first_answer is None:
+                first_answer = time.perf_counter()
+                Record("first_answer_chunk", first_answer - start)
+            if on_chunk is not None:
+                on_chunk(task, chunk)
+            if speak:
+                speech.feed(chunk)
+        if speak:
+            speech.finish()
+
+    guess.commit()
+    group.wait()
+    end = time.perf_counter()
+
+    tasks = []
+    for task in group.tasks:
+        result = task.result
+        tasks.append({
+            "task": task.name,
+            "kind": task.kind,
+            "ms": round((task.finished - task.submitted) * 1000, 1) if task.finished else None,
+            "timed_out": task.timed_out,
+            "error": str(task.error) if task.error is not None else None,
+            "result": result.strip() if isinstance(result, str) else result,
+        })
+
+    return {
+        "query": query,
+        "decision": decision,
+        "tasks": tasks,
+        "decision_ms": round((decided - start) * 1000, 1),
+        "first_answer_ms": round((first_answer - start) * 1000, 1) if first_answer else None,
+        "total_ms": round((end - start) * 1000, 1),
+    }
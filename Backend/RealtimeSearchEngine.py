@@ -1,8 +1,10 @@
-from googlesearch import search
-from groq import Groq
-from json import load, dump
 import datetime
+import threading
+import time
 from dotenv import dotenv_values
+from Backend.ChatHistory import History
+from Backend.ContextWindow import BuildContext, EstimateTokens
+from Backend.Tracing import Record
 
 # Load environment variables from the .env file.
 env_vars = dotenv_values(".env")
@@ -12,38 +14,31 @@ Username = env_vars.get("Username")
 Assistantname = env_vars.get("Assistantname")
 GroqAPIKey = env_vars.get("GroqAPIKey")
 
-# Initialize the Groq client with the provided API key.
-client = Groq(api_key=GroqAPIKey)
+# Groq client, created on first use so the SDK is not imported at startup.
+client = None
+_client_lock = threading.Lock()
+
+def GetClient():
+    global client
+    with _client_lock:
+        if client is None:
+            from groq import Groq
+            client = Groq(api_key=GroqAPIKey)
+        return client
 
 # Define the system instructions for the chatbot.
 System = f"""Hello, I am {Username}, You are a very accurate and advanced AI chatbot named {Assistantname} which has real-time up-to-date information from the internet.
 *** Provide Answers In a Professional Way, make sure to add full stops, commas, question marks, and use proper grammar.***
 *** Just answer the question from the provided data in a professional way. ***"""
 
-# Try to load the chat log from a JSON file, or create an empty one if it doesn't exist.
-try:
-    with open(r"Data\ChatLog.json", "r") as f:
-        messages = load(f)
-except:
-    with open(r"Data\ChatLog.json", "w") as f:
-        dump([], f)
-
 # -------------------------------------------------------------
-# FIXED GOOGLE SEARCH FUNCTION
-# googlesearch does NOT support advanced=True, title, description, etc.
+# GOOGLE SEARCH FUNCTION
+# googlesearch only returns URLs; Backend/WebSearch.py caches the results and
+# adds each page's title and a short snippet.
 # -------------------------------------------------------------
 def GoogleSearch(query):
-    Answer = f"The search results for '{query}' are:\n[start]\n"
-
-    count = 0
-    for url in search(query):   # old googlesearch supports ONLY this
-        Answer += f"URL: {url}\nDescription: Not available\n\n"
-        count += 1
-        if count == 5:
-            break
-
-    Answer += "[end]"
-    return Answer
+    from Backend.WebSearch import SearchWeb, FormatResults
+    return FormatResults(query, SearchWeb(query))
 
 
 # Function to clean up the answer by removing empty lines.
@@ -54,11 +49,12 @@ def AnswerModifier(Answer):
     return modified_answer
 
 # Predefined chatbot conversation system message and an initial user message.
-SystemChatBot = [
+# Shared by every request, so it is a tuple that nothing appends to.
+SystemChatBot = (
     {"role": "system", "content": System},
     {"role": "user", "content": "Hi"},
     {"role": "assistant", "content": "Hello, how can I help you?"}
-]
+)
 
 # Function to get real-time information like the current date and time.
 def Information():
@@ -82,22 +78,37 @@ def Information():
     return data
 
 
-# Function to handle real-time search and response generation.
-def RealtimeSearchEngine(prompt):
-    global SystemChatBot, messages
+# The messages sent to Groq for one request. Built from scratch every time
+# (the shared SystemChatBot is only read), so concurrent requests never see
+# each other's search results.
+def BuildPrompt(prompt, results, store):
+    Preamble = [*SystemChatBot, {"role": "system", "content": results}]
+    RealtimeInformation = [{"role": "system", "content": Information()}]
 
-    # Load the chat log from the JSON file.
-    with open(r"Data\ChatLog.json", "r") as f:
-        messages = load(f)
+    # Load the recent and relevant turns that fit the Groq token budget.
+    reserved = sum(EstimateTokens(m["content"]) for m in Preamble + RealtimeInformation) + EstimateTokens(prompt)
+    Background, messages = BuildContext(store, "groq", query=prompt, reserved=reserved)
     messages.append({"role": "user", "content": f"{prompt}"})
 
-    # Add Google search results to the system chatbot messages.
-    SystemChatBot.append({"role": "system", "content": GoogleSearch(prompt)})
+    # Summary and relevant parts of older turns.
+    if Background:
+        RealtimeInformation.append({"role": "system", "content": f"Context from the earlier conversation:\n{Background}"})
+
+    return Preamble + RealtimeInformation + messages
+
+
+# Function to handle real-time search, yielding the answer chunk by chunk.
+# results, if given, are GoogleSearch(prompt) output fetched ahead of time;
+# store defaults to the shared History. Safe to call from several threads.
+def RealtimeSearchEngineStream(prompt, results=None, store=None):
+    store = store or History
+    messages = BuildPrompt(prompt, results if results is not None else GoogleSearch(prompt), store)
 
     # Generate a response using the Groq client.
-    completion = client.chat.completions.create(
+    Started = time.perf_counter()
+    completion = GetClient().chat.completions.create(
         model="llama-3.1-8b-instant",
-        messages=SystemChatBot + [{"role": "system", "content": Information()}] + messages,
+        messages=messages,
         temperature=0.7,
         max_tokens=2048,
         top_p=1,
@@ -107,25 +118,108 @@ def RealtimeSearchEngine(prompt):
 
     Answer = ""
 
-    # Concatenate response chunks from the streaming output.
+    # Pass response chunks on as they arrive, skipping leading whitespace.
     for chunk in completion:
-        if chunk.choices[0].delta.content:
-            Answer += chunk.choices[0].delta.content
+        text = chunk.choices[0].delta.content
+        if text:
+            text = text.replace("</s>", "")
+            if not Answer:
+                text = text.lstrip()
+            if text:
+                if not Answer:
+                    Record("llm_first_token", time.perf_counter() - Started, provider="groq")
+                Answer += text
+                yield text
 
-    # Clean up the response.
-    Answer = Answer.strip().replace("</s>", "")
-    messages.append({"role": "assistant", "content": Answer})
+    Record("llm_complete", time.perf_counter() - Started, provider="groq", chars=len(Answer))
 
-    # Save the updated chat log back to the JSON file.
-    with open(r"Data\ChatLog.json", "w") as f:
-        dump(messages, f, indent=4)
+    # Append the new turn to the chat log.
+    store.extend([messages[-1], {"role": "assistant", "content": Answer.strip()}])
 
-    # Remove the most recent system message from the chatbot conversation.
-    SystemChatBot.pop()
-    return AnswerModifier(Answer=Answer)
+
+# Function to handle real-time search and response generation.
+def RealtimeSearchEngine(prompt):
+    Answer = "".join(RealtimeSearchEngineStream(prompt))
+    return AnswerModifier(Answer=Answer.strip())
+
+
+def StressTest(queries=64, workers=(1, 4, 16), latency=0.1):
+    """
+    Fire parallel queries at a stand-in Groq client that answers after
+    `latency` seconds, check that every prompt carried only its own search
+    results and that a failed request leaves nothing behind, and report how
+    throughput scales with the number of threads.
+    """
+    import contextlib
+    import io
+    import os
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+    from types import SimpleNamespace
+    from Backend import Tracing
+    from Backend.ChatHistory import ChatHistoryStore
+    global client
+
+    prompts = {}   # query -> messages sent for it
+    lock = threading.Lock()
+
+    def create(messages, **kwargs):
+        query = messages[-1]["content"]
+        with lock:
+            prompts[query] = list(messages)
+        time.sleep(latency)
+        for word in f"answer to {query}".split():
+            if query.startswith("fail"):
+                raise RuntimeError("stream broken")
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word + " "))])
+
+    # The search results of every prompt, which must be its own and nothing else.
+    def check(query):
+        searches = [m["content"] for m in prompts[query] if m["content"].startswith("Search results:")]
+        return searches == [f"Search results: {query}"]
+
+    original, client = client, SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    # Keep the fake latencies out of Data/Trace.jsonl and the real percentiles.
+    traces, Tracing.Traces = Tracing.Traces, Tracing.Tracer(path=None, enabled=True)
+    failures = 0
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for n in workers:
+                store = ChatHistoryStore(path=os.path.join(directory, f"Stress{n}.db"), legacy_path=None)
+                batch = [f"fail {n}-{i}" if i % 16 == 0 else f"query {n}-{i}" for i in range(queries)]
+
+                def run(query):
+                    try:
+                        return "".join(RealtimeSearchEngineStream(query, f"Search results: {query}", store)).strip()
+                    except RuntimeError:
+                        return None
+
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(n) as pool:
+                    answers = list(pool.map(run, batch))
+                elapsed = time.perf_counter() - start
+
+                wrong = [q for q, a in zip(batch, answers) if not q.startswith("fail") and a != f"answer to {q}"]
+                leaked = [q for q in batch if not check(q)]
+                failures += len(wrong) + len(leaked)
+                print(f"{n:>3} threads  {elapsed * 1000:7.0f} ms  {queries / elapsed:6.1f} queries/second  "
+                      f"{len(wrong)} wrong answers, {len(leaked)} prompts with foreign search results")
+                store.close()
+    finally:
+        client = original
+        Tracing.Traces = traces
+
+    print("OK" if failures == 0 and len(SystemChatBot) == 3 else "FAILED")
+    return failures == 0
 
 
 if __name__ == "__main__":
+    import sys
+
+    # python -m Backend.RealtimeSearchEngine stress   # concurrency stress test, no network needed
+    if sys.argv[1:] == ["stress"]:
+        sys.exit(0 if StressTest() else 1)
+
     while True:
         prompt = input("Enter your query: ")
         print(RealtimeSearchEngine(prompt))
@@ -0,0 +1,160 @@
+# Conversation state of the sessions served by Server.py.
+#
+# The desktop assistant keeps one chat log, one decision cache and one query
+# context for its single user. A server for a whole team gives every session
+# its own: a chat log database and decision cache in Data/Sessions/<id>/, and
+# a bounded list of recent queries. Sessions are opened on demand; the least
+# recently used ones are closed when more than MaxOpenSessions are open or
+# after SessionIdleSeconds without a query. Their files stay on disk, so a
+# session can be picked up again later, also after a restart.
+#
+# .env settings:
+#   SessionDirectory=Data/Sessions
+#   MaxOpenSessions=64
+#   SessionIdleSeconds=1800
+
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dotenv import dotenv_values
+from Backend.ChatHistory import ChatHistoryStore
+from Backend.DecisionCache import DecisionCache
+from Backend.HistoryIndex import DropIndex
+
+env_vars = dotenv_values(".env")
+
+Directory = env_vars.get("SessionDirectory") or r"Data/Sessions"
+MaxOpen = int(env_vars.get("MaxOpenSessions") or 64)
+IdleSeconds = float(env_vars.get("SessionIdleSeconds") or 1800)
+
+# Recent queries kept as a session's decision context.
+ContextMessages = 100
+
+# Session ids are used as directory names.
+IdPattern = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def ValidSessionId(session_id):
+    return bool(IdPattern.match(str(session_id)))
+
+
+class Session:
+    """One conversation: chat log, decision cache, recent queries and the query running for it."""
+
+    def __init__(self, session_id, directory=Directory):
+        self.id = session_id
+        self.path = os.path.join(directory, session_id)
+        self.store = ChatHistoryStore(path=os.path.join(self.path, "ChatLog.db"), legacy_path=None)
+        self.cache = DecisionCache(path=os.path.join(self.path, "DecisionCache.json"))
+        self.context = deque(maxlen=ContextMessages)
+        self.task = None
+        self.used = time.monotonic()
+        self._lock = threading.Lock()
+
+    def busy(self):
+        return self.task is not None and not self.task.done.is_set()
+
+    # Start a query with submit(session) unless one is already running in
+    # this session, so turns are logged in order. Returns the task or None.
+    def run(self, submit):
+        with self._lock:
+            if self.busy():
+                return None
+            self.task = submit(self)
+            self.used = time.monotonic()
+            return self.task
+
+    def close(self):
+        DropIndex(self.store)
+        self.store.close()
+
+
+class SessionManager:
+    """Open sessions by id, least recently used first."""
+
+    def __init__(self, directory=Directory, max_open=MaxOpen, idle_seconds=IdleSeconds):
+        self.directory = directory
+        self.max_open = max_open
+        self.idle_seconds = idle_seconds
+        self.sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self):
+        return self.get(uuid.uuid4().hex, create=True)
+
+    # The open or stored session with this id, or None if there is none and create is False.
+    def get(self, session_id, create=False):
+        with self._lock:
+            session = self._open(session_id, create)
+            self._evict(keep=session)
+            return session
+
+    # Call func(session) while the session cannot be closed by eviction or
+    # delete(). Returns (session, result), or (None, None) if there is no such session.
+    def use(self, session_id, func):
+        with self._lock:
+            session = self._open(session_id)
+            result = func(session) if session is not None else None
+            self._evict(keep=session)
+            return session, result
+
+    # Look up the session and start a query in it (see Session.run) in one
+    # step. Returns (session, task).
+    def run(self, session_id, submit):
+        return self.use(session_id, lambda session: session.run(submit))
+
+    def _open(self, session_id, create=False):
+        if not ValidSessionId(session_id):
+            return None
+
+        session = self.sessions.get(session_id)
+        if session is None:
+            if not create and not os.path.isdir(os.path.join(self.directory, session_id)):
+                return None
+            session = self.sessions[session_id] = Session(session_id, self.directory)
+
+        self.sessions.move_to_end(session_id)
+        session.used = time.monotonic()
+        return session
+
+    # Close idle sessions and the least recently used ones beyond max_open.
+    def _evict(self, keep=None):
+        now = time.monotonic()
+        for session_id, session in list(self.sessions.items()):
+            if len(self.sessions) <= self.max_open and now - session.used < self.idle_seconds:
+                break
+            if session.busy() or session is keep:
+                continue
+            del self.sessions[session_id]
+            session.close()
+
+    # Close the session and remove its files. None if it does not exist, False while a query is running.
+    def delete(self, session_id):
+        session = self.get(session_id)
+        if session is None:
+            return None
+
+        with self._lock, session._lock:
+            if session.busy():
+                return False
+            self.sessions.pop(session_id, None)
+            session.close()
+            shutil.rmtree(session.path, ignore_errors=True)
+            return True
+
+    def close_all(self):
+        with self._lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "open": len(self.sessions),
+                "busy": sum(1 for session in self.sessions.values() if session.busy()),
+            }
@@ -0,0 +1,248 @@
+# Speculative answers that overlap the decision model call.
+#
+# Most queries end up as "general <query>", yet the chatbot only starts once
+# Cohere has decided. In speculative mode the chatbot answer (and optionally
+# the web search for a realtime answer) starts on the task pool at the moment
+# the query is sent to Cohere. If the decision turns out to be that same
+# general query the running answer is adopted; otherwise it is cancelled and
+# nothing is written to the chat log.
+#
+# Speculation only starts when the decision needs Cohere: fast path, cache
+# and offline model decisions are instant and gain nothing from it.
+#
+# .env settings:
+#   Speculate=False          (start the chatbot answer during the decision)
+#   SpeculateSearch=False    (also fetch search results for a realtime answer)
+#
+# Usage:
+#   python -m Backend.Speculation   # benchmark with stand-in decision and answer
+
+import threading
+import time
+from collections import Counter
+from dotenv import dotenv_values
+from Backend.DecisionCache import NormalizeQuery
+
+env_vars = dotenv_values(".env")
+
+Enabled = str(env_vars.get("Speculate", "False")).lower() == "true"
+SearchEnabled = str(env_vars.get("SpeculateSearch", "False")).lower() == "true"
+
+
+class SpeculationMetrics:
+    """Hit rate, latency saved and work discarded, to tune when to speculate."""
+
+    def __init__(self):
+        self.local = 0        # Decided without Cohere, so no speculation was started
+        self.hits = 0
+        self.misses = 0
+        self.saved = 0.0      # Seconds of answer generation that overlapped the decision
+        self.wasted = 0.0     # Seconds of generation discarded on misses
+        self.search_hits = 0
+        self.search_misses = 0
+        self.miss_categories = Counter()
+        self._lock = threading.Lock()
+
+    def record_local(self):
+        with self._lock:
+            self.local += 1
+
+    def record(self, hit, seconds, category=None):
+        with self._lock:
+            if hit:
+                self.hits += 1
+                self.saved += seconds
+            else:
+                self.misses += 1
+                self.wasted += seconds
+                self.miss_categories[category or "none"] += 1
+
+    def record_search(self, hit):
+        with self._lock:
+            if hit:
+                self.search_hits += 1
+            else:
+                self.search_misses += 1
+
+    def stats(self):
+        with self._lock:
+            started = self.hits + self.misses
+            searches = self.search_hits + self.search_misses
+            return {
+                "speculations": started,
+                "local": self.local,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / started if started else 0.0,
+                "saved_ms": self.saved * 1000,
+                "avg_saved_ms": self.saved * 1000 / self.hits if self.hits else 0.0,
+                "wasted_ms": self.wasted * 1000,
+                "search_hit_rate": self.search_hits / searches if searches else 0.0,
+                "miss_categories": dict(self.miss_categories),
+            }
+
+
+Metrics = SpeculationMetrics()
+
+
+def _answer(query, store=None):
+    from Backend.Chatbot import ChatBotStream
+    return ChatBotStream(query, persist=False, store=store)
+
+
+def _search(query):
+    from Backend.RealtimeSearchEngine import GoogleSearch
+    return GoogleSearch(query)
+
+
+class Speculation:
+    """
+    Speculative work for one query. start() launches it, claim_answer() and
+    search_results() hand it over to the matching decision entries, and
+    finish() cancels whatever was not used and records the outcome.
+    """
+
+    def __init__(self, orchestrator, query, enabled=Enabled, search=SearchEnabled,
+                 answer_func=_answer, search_func=_search, metrics=Metrics, store=None):
+        self.orchestrator = orchestrator
+        self.query = query
+        self.key = NormalizeQuery(query)
+        self.enabled = enabled
+        self.search_enabled = search
+        self.answer_func = answer_func
+        self.search_func = search_func
+        self.metrics = metrics
+        self.store = store   # Chat log the answer is built from and committed to (None: shared History)
+        self.answer = None
+        self.search = None
+        self.claimed_at = None
+        self.search_claimed = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            if self.answer is not None:
+                return
+            self.answer = self.orchestrator.submit(f"speculative general {self.query}", self.answer_func,
+                                                   self.query, self.store, kind="general", streams=True)
+            if self.search_enabled:
+                self.search = self.orchestrator.submit(f"speculative search {self.query}", self.search_func,
+                                                       self.query, kind="search")
+
+    # The running answer if the decision asks for this same general query.
+    def claim_answer(self, query):
+        with self._lock:
+            if self.answer is None or self.claimed_at is not None or NormalizeQuery(query) != self.key:
+                return None
+            self.claimed_at = time.perf_counter()
+            return self.answer
+
+    # Search results fetched ahead of time for this query, or None.
+    # Blocks until the speculative search has finished.
+    def search_results(self, query):
+        with self._lock:
+            search = self.search
+            if search is None or self.search_claimed or NormalizeQuery(query) != self.key:
+                return None
+            self.search_claimed = True
+        if not search.wait() or search.error is not None:
+            return None
+        return search.result
+
+    # Called once the whole decision is known.
+    def finish(self, decision):
+        with self._lock:
+            answer, search = self.answer, self.search
+            claimed_at = self.claimed_at
+            search_claimed = self.search_claimed
+
+        if answer is None:
+            if self.enabled:
+                self.metrics.record_local()
+            return
+
+        if claimed_at is not None:
+            # The answer had this much of a head start over a normal one.
+            saved = min(claimed_at, answer.finished or claimed_at) - answer.submitted
+            self.metrics.record(True, saved)
+            print(f"[speculation] hit, saved {saved * 1000:.0f} ms")
+        else:
+            answer.cancel()
+            wasted = (answer.finished or time.perf_counter()) - answer.submitted
+            category = decision[0].split(" ")[0] if decision else None
+            self.metrics.record(False, wasted, category)
+            print(f"[speculation] miss ({category}), discarded {wasted * 1000:.0f} ms of generation")
+
+        if search is not None:
+            if not search_claimed:
+                search.cancel()
+            self.metrics.record_search(search_claimed)
+
+    # Store the adopted answer in the chat log once it is complete.
+    def commit(self):
+        from Backend.Chatbot import CommitExchange
+
+        with self._lock:
+            answer = self.answer if self.claimed_at is not None else None
+        if answer is None:
+            return False
+        if not answer.wait() or answer.cancelled.is_set() or answer.error is not None:
+            return False
+        CommitExchange(self.query, answer.result, self.store)
+        return True
+
+
+def SpeculationStats():
+    return Metrics.stats()
+
+
+def Benchmark(rounds=20, general_share=0.8):
+    import random
+    from Backend.TaskOrchestrator import TaskOrchestrator
+
+    # Stand-ins: the decision takes 0.6 s, the answer streams 12 words in 0.6 s.
+    def decide(query, general, on_remote):
+        on_remote()
+        time.sleep(0.6)
+        return [f"general {query}"] if general else [f"realtime {query}"]
+
+    def answer(query, store=None):
+        for word in range(12):
+            time.sleep(0.05)
+            yield f"word{word} "
+
+    orchestrator = TaskOrchestrator(workers=4)
+    metrics = SpeculationMetrics()
+    serial = speculative = 0.0
+    random.seed(1)
+
+    for n in range(rounds):
+        query = f"question {n}"
+        general = random.random() < general_share
+
+        start = time.perf_counter()
+        decision = decide(query, general, lambda: None)
+        if general:
+            "".join(answer(query))
+        serial += time.perf_counter() - start
+
+        start = time.perf_counter()
+        guess = Speculation(orchestrator, query, enabled=True, search=False, answer_func=answer, metrics=metrics)
+        decision = decide(query, general, guess.start)
+        task = guess.claim_answer(decision[0].removeprefix("general ")) if general else None
+        guess.finish(decision)
+        if general:
+            "".join(task.chunks())
+        speculative += time.perf_counter() - start
+
+    stats = metrics.stats()
+    print(f"Serial       {serial / rounds * 1000:7.1f} ms per query")
+    print(f"Speculative  {speculative / rounds * 1000:7.1f} ms per query")
+    print(f"Hit rate {stats['hit_rate']:.0%}, saved {stats['avg_saved_ms']:.0f} ms per hit, "
+          f"discarded {stats['wasted_ms']:.0f} ms of generation on misses")
+
+
+if __name__ == "__main__":
+    Benchmark()
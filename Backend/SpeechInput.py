@@ -0,0 +1,157 @@
+# Pluggable speech input backends.
+#
+# MainExecution asks SpeechInput() for the next query and does not care where
+# it comes from. The "webdriver" backend is the Chrome/Selenium recognizer in
+# SpeechToText.py; the "replay" backend reads transcripts from a file with
+# simulated timing, so the rest of the pipeline can be run and load-tested on
+# machines without a browser or microphone (also headless: python Headless.py
+# --replay FILE).
+#
+# .env settings:
+#   SpeechBackend=webdriver|replay
+#   PrewarmSpeech=True                        (start the backend right after the GUI appears)
+#   SpeechReplayFile=Data/SpeechReplay.txt   (plain lines or JSONL {"text", "delay"})
+#   SpeechReplayDelay=1.0                     (seconds per utterance when no delay is given)
+#   SpeechReplaySpeed=1.0                     (multiplier on delays; 0 replays instantly)
+#   SpeechReplayLoop=False                    (start over at the end of the file; else wait for nothing more)
+
+import json
+import threading
+import time
+from dotenv import dotenv_values
+
+env_vars = dotenv_values(".env")
+
+
+class SpeechBackend:
+    """Interface of a speech input backend."""
+
+    def listen(self) -> str:
+        """Block until the next utterance and return its transcript ("" if none)."""
+        raise NotImplementedError
+
+    def prewarm(self):
+        """Start any expensive resources before the first listen() (may block)."""
+        pass
+
+    def close(self):
+        pass
+
+
+class WebDriverSpeech(SpeechBackend):
+    """Browser speech recognition through Selenium (Data/Voice.html)."""
+
+    def listen(self) -> str:
+        # Imported on first use so other backends never start Chrome.
+        from Backend.SpeechToText import SpeechRecognition
+        return SpeechRecognition()
+
+    def prewarm(self):
+        from Backend.SpeechToText import GetDriver
+        GetDriver()
+
+
+class ReplaySpeech(SpeechBackend):
+    """Replays transcripts from a text or JSONL file with simulated speaking time."""
+
+    def __init__(self, path, delay=1.0, speed=1.0, loop=False):
+        self.path = path
+        self.delay = delay
+        self.speed = speed
+        self.loop = loop
+        self.entries = self._read(path)
+        self.position = 0
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+
+    def _read(self, path):
+        entries = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                if line.startswith("{"):
+                    entry = json.loads(line)
+                    entries.append((entry["text"], float(entry.get("delay", self.delay))))
+                else:
+                    entries.append((line, self.delay))
+        return entries
+
+    @property
+    def exhausted(self):
+        return not self.loop and self.position >= len(self.entries)
+
+    # Once a replay that does not loop is done, listening blocks until
+    # close() (like a microphone nobody speaks into) instead of returning ""
+    # at once, which would spin the caller's listen loop.
+    def listen(self) -> str:
+        with self._lock:
+            if self.entries and self.loop and self.position >= len(self.entries):
+                self.position = 0
+            if self.position >= len(self.entries):
+                text, delay = "", None
+            else:
+                text, delay = self.entries[self.position]
+                self.position += 1
+
+        if delay is None:
+            self._closed.wait()
+        else:
+            time.sleep(delay * self.speed)
+        return text
+
+    def close(self):
+        self._closed.set()
+
+
+Backends = {
+    "webdriver": lambda: WebDriverSpeech(),
+    "replay": lambda: ReplaySpeech(
+        env_vars.get("SpeechReplayFile") or r"Data/SpeechReplay.txt",
+        delay=float(env_vars.get("SpeechReplayDelay") or 1.0),
+        speed=float(env_vars.get("SpeechReplaySpeed") or 1.0),
+        loop=str(env_vars.get("SpeechReplayLoop", "False")).lower() == "true",
+    ),
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def SetSpeechBackend(backend):
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+# The configured backend, created on first use.
+def GetSpeechBackend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            name = (env_vars.get("SpeechBackend") or "webdriver").strip().lower()
+            if name not in Backends:
+                raise ValueError(f"Unknown SpeechBackend '{name}' in .env; use one of: {', '.join(Backends)}")
+            _backend = Backends[name]()
+        return _backend
+
+
+def SpeechInput():
+    return GetSpeechBackend().listen()
+
+
+# Warm up the configured backend on a background thread unless PrewarmSpeech=False.
+def PrewarmSpeechInput():
+    if str(env_vars.get("PrewarmSpeech", "True")).lower() == "false":
+        return None
+
+    def warm():
+        try:
+            GetSpeechBackend().prewarm()
+        except Exception as e:
+            print(f"Error preparing speech input: {e}")
+
+    thread = threading.Thread(target=warm, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,169 @@
+# Sentence-pipelined speech output.
+#
+# Text is split into sentences and each sentence is synthesized on a worker
+# thread while the previous one is playing, so the first sentence is heard as
+# soon as it is synthesized instead of after the whole answer. Sentences can
+# be fed one at a time while an LLM answer is still streaming in.
+#
+# The pipeline only needs two callables, synthesize(text) -> clip and
+# play(clip, func) -> bool, which keeps it independent of edge-tts and pygame.
+#
+# Usage:
+#   python -m Backend.SpeechPipeline   # benchmark with stand-in synthesis/playback
+
+import queue
+import re
+import threading
+from Backend.Tracing import CurrentTrace, UseTrace
+
+SentenceEnd = re.compile(r"(?<=[.!?])\s+")
+
+_Done = object()   # Marks the end of the sentence and clip queues.
+
+
+def SplitSentences(text):
+    return [s.strip() for s in SentenceEnd.split(str(text)) if s.strip()]
+
+
+class SentenceBuffer:
+    """Collects streamed text chunks and hands back complete sentences."""
+
+    def __init__(self):
+        self.pending = ""
+
+    def feed(self, chunk):
+        self.pending += chunk
+        parts = SentenceEnd.split(self.pending)
+        self.pending = parts.pop()
+        return [p.strip() for p in parts if p.strip()]
+
+    def flush(self):
+        rest, self.pending = self.pending.strip(), ""
+        return [rest] if rest else []
+
+
+class SpeechPipeline:
+    """Synthesizes sentence N+1 in the background while sentence N plays."""
+
+    def __init__(self, synthesize, play, func=lambda r=None: True, lookahead=2):
+        self.synthesize = synthesize
+        self.play = play
+        self.func = func
+        self.sentences = queue.Queue()
+        self.clips = queue.Queue(maxsize=lookahead)   # Bounds how far synthesis runs ahead.
+        self.cancelled = threading.Event()
+        self.completed = True
+        self.trace = CurrentTrace()
+        self._synth_thread = threading.Thread(target=self._synthesize_loop, daemon=True)
+        self._play_thread = threading.Thread(target=self._play_loop, daemon=True)
+        self._synth_thread.start()
+        self._play_thread.start()
+
+    def speak(self, sentence):
+        if sentence.strip():
+            self.sentences.put(sentence)
+
+    # No more sentences will be added.
+    def close(self):
+        self.sentences.put(_Done)
+
+    # Block until everything queued has been played; True if nothing was interrupted.
+    def wait(self):
+        self._play_thread.join()
+        self._synth_thread.join()
+        return self.completed
+
+    def cancel(self):
+        self.cancelled.set()
+        self.close()
+
+    def _synthesize_loop(self):
+        UseTrace(self.trace)
+        while True:
+            sentence = self.sentences.get()
+            if sentence is _Done or self.cancelled.is_set():
+                break
+            try:
+                clip = self.synthesize(sentence)
+            except Exception as e:
+                print(f"Error in TTS: {e}")
+                continue
+            self.clips.put(clip)
+        self.clips.put(_Done)
+
+    def _play_loop(self):
+        UseTrace(self.trace)
+        while True:
+            clip = self.clips.get()
+            if clip is _Done:
+                break
+            if self.cancelled.is_set():
+                continue
+            try:
+                if self.play(clip, self.func) is False:
+                    # The caller's func asked to stop: drop the rest of the answer.
+                    self.completed = False
+                    self.cancelled.set()
+            except Exception as e:
+                print(f"Error in TTS: {e}")
+
+
+def Benchmark():
+    import time
+
+    answer = ("Mahatma Gandhi was an Indian lawyer and political ethicist. He led the campaign for India's "
+              "independence from British rule. He employed nonviolent resistance. He inspired movements for "
+              "civil rights across the world. He was assassinated in 1948.")
+    tokens = answer.split(" ")
+
+    # Stand-ins: synthesis costs a fixed round trip plus time per character,
+    # playback takes about as long as speaking the words.
+    def synthesize(text):
+        time.sleep(0.15 + 0.002 * len(text))
+        return text
+
+    def play(clip, func):
+        time.sleep(0.05 * len(clip.split()))
+        return True
+
+    # LLM stand-in streaming one word every 15 ms.
+    def stream():
+        for token in tokens:
+            time.sleep(0.015)
+            yield token + " "
+
+    def serial():
+        start = time.perf_counter()
+        text = "".join(stream())
+        clip = synthesize(text)
+        first = time.perf_counter() - start
+        play(clip, None)
+        return first, time.perf_counter() - start
+
+    def pipelined():
+        start = time.perf_counter()
+        first = []
+
+        def timed_play(clip, func):
+            if not first:
+                first.append(time.perf_counter() - start)
+            return play(clip, func)
+
+        pipeline = SpeechPipeline(synthesize, timed_play)
+        buffer = SentenceBuffer()
+        for chunk in stream():
+            for sentence in buffer.feed(chunk):
+                pipeline.speak(sentence)
+        for sentence in buffer.flush():
+            pipeline.speak(sentence)
+        pipeline.close()
+        pipeline.wait()
+        return first[0], time.perf_counter() - start
+
+    for name, run in (("Current (whole answer)", serial), ("Sentence pipeline", pipelined)):
+        first, total = run()
+        print(f"{name:24} time to first audio {first * 1000:7.1f} ms, total wall time {total * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    Benchmark()
@@ -1,15 +1,19 @@
 from selenium import webdriver
-from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from webdriver_manager.chrome import ChromeDriverManager
 from dotenv import dotenv_values
 import os
-import mtranslate as mt
+import threading
+from Backend.Translator import Translate
 
 env_vars = dotenv_values(".env")
 InputLanguage = env_vars.get("InputLanguage", "en")
 
+# Seconds to wait for a final transcript before giving up on a query.
+ListenTimeout = float(env_vars.get("ListenTimeout") or 10)
+
 HtmlCode = """
 <!DOCTYPE html>
 <html lang="en">
@@ -23,21 +27,52 @@ HtmlCode = """
     <script>
         const output = document.getElementById('output');
         let recognition;
+        let running = false;
+        let waiting = null;
 
         function startRecognition() {
+            if (running) return;
             recognition = new webkitSpeechRecognition();
             recognition.lang = '@LANG';
             recognition.continuous = true;
+            recognition.interimResults = false;
 
             recognition.onresult = function(event) {
-                const transcript = event.results[event.results.length - 1][0].transcript;
-                output.textContent = transcript;
+                for (let i = event.resultIndex; i < event.results.length; i++) {
+                    if (!event.results[i].isFinal) continue;
+                    const transcript = event.results[i][0].transcript;
+                    output.textContent = transcript;
+                    if (waiting) {
+                        const done = waiting;
+                        waiting = null;
+                        done(transcript);
+                    }
+                }
+            };
+
+            // Chrome ends recognition after a stretch of silence; keep listening while someone waits.
+            recognition.onend = function() {
+                running = false;
+                if (waiting) startRecognition();
             };
+
+            running = true;
             recognition.start();
         }
 
         function stopRecognition() {
-            recognition.stop();
+            waiting = null;
+            if (recognition) recognition.stop();
+        }
+
+        // Resolve `done` with the next final transcript.
+        function awaitTranscript(done) {
+            waiting = done;
+            startRecognition();
+        }
+
+        function cancelTranscript() {
+            waiting = null;
         }
     </script>
 </body>
@@ -46,10 +81,6 @@ HtmlCode = """
 
 HtmlCode = HtmlCode.replace("@LANG", InputLanguage)
 
-os.makedirs("Data", exist_ok=True)
-with open("Data/Voice.html", "w", encoding="utf-8") as file:
-    file.write(HtmlCode)
-
 current_dir = os.getcwd()
 Link = f"{current_dir}/Data/Voice.html"
 
@@ -57,25 +88,95 @@ chrome_options = Options()
 chrome_options.binary_location = r"C:\Program Files\Google\Chrome\Application\chrome.exe"
 chrome_options.add_argument("--use-fake-ui-for-media-stream")
 
-service = Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=service, options=chrome_options)
+# The browser is started on first use (or prewarmed by SpeechInput) and reused for the
+# whole process; it is relaunched if it stops responding.
+driver = None
+_driver_lock = threading.Lock()
+_driver_path = None
+
+def LaunchDriver():
+    global _driver_path
+
+    os.makedirs("Data", exist_ok=True)
+    with open("Data/Voice.html", "w", encoding="utf-8") as file:
+        file.write(HtmlCode)
+
+    # Resolve the chromedriver binary once per process.
+    if _driver_path is None:
+        _driver_path = ChromeDriverManager().install()
+
+    service = Service(_driver_path)
+    return webdriver.Chrome(service=service, options=chrome_options)
+
+def DriverAlive(candidate):
+    try:
+        candidate.execute_script("return 1")
+        return True
+    except WebDriverException:
+        return False
+
+def GetDriver():
+    global driver
+    with _driver_lock:
+        if driver is not None and not DriverAlive(driver):
+            print("Speech recognition browser stopped responding, relaunching it.")
+            try:
+                driver.quit()
+            except Exception:
+                pass
+            driver = None
+
+        if driver is None:
+            driver = LaunchDriver()
+        return driver
 
 def UniversalTranslator(Text):
-    return mt.translate(Text, "en", "auto").capitalize()
+    return Translate(Text, "en", "auto").capitalize()
 
-def SpeechRecognition():
-    driver.get("file://" + Link)
-    driver.find_element(By.ID, "start").click()
+# Load Voice.html once and keep it open across queries.
+def LoadRecognitionPage(browser):
+    loaded = browser.execute_script("return typeof awaitTranscript === 'function'")
+    if not loaded:
+        browser.get("file://" + Link)
 
-    last_text = ""
-    while True:
-        text = driver.find_element(By.ID, "output").text
-        if text != last_text and text.strip():
-            return text.strip()
-        last_text = text
+def SpeechRecognition(timeout=ListenTimeout):
+    try:
+        browser = GetDriver()
+        LoadRecognitionPage(browser)
+
+        # Block inside the browser until the page reports a final transcript,
+        # instead of polling the output element.
+        browser.set_script_timeout(timeout)
+        try:
+            text = browser.execute_async_script(
+                "const done = arguments[arguments.length - 1]; awaitTranscript(done);"
+            )
+        except TimeoutException:
+            browser.execute_script("cancelTranscript();")
+            return ""
+
+    except WebDriverException as e:
+        # The browser crashed mid-query or could not be started (e.g.
+        # SessionNotCreatedException); GetDriver tries again next time.
+        print(f"Speech recognition error: {e}")
+        return ""
+
+    except (OSError, ValueError) as e:
+        # ChromeDriverManager could not download or find a matching chromedriver.
+        print(f"Speech recognition browser could not be started: {e}")
+        return ""
+
+    text = (text or "").strip()
+
+    # Queries are handled in English; English speech is detected locally and not sent.
+    if text and not InputLanguage.lower().startswith("en"):
+        text = UniversalTranslator(text)
+
+    return text
 
 if __name__ == "__main__":
     print("🎙 Listening...")
     while True:
         result = SpeechRecognition()
-        print("You said:", result)
+        if result:
+            print("You said:", result)
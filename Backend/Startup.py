@@ -0,0 +1,131 @@
+# Startup profiling and background pre-warming.
+#
+# Provider SDKs (cohere, groq, google-genai, pygame, edge-tts, selenium, ...)
+# are imported on first use, so the window can appear before any of them is
+# loaded. PrewarmBackends() then imports them, builds the API clients and
+# synthesizes the canned responses into the audio cache on a background
+# thread, so the first query does not pay for it either.
+#
+# Profile a cold start with:
+#   python Main.py --profile-startup     (or ProfileStartup=True in .env)
+# It prints the slowest imports (self and cumulative time, like
+# python -X importtime) and the time from Main.py starting to the first GUI frame.
+
+import builtins
+import sys
+import threading
+import time
+from dotenv import dotenv_values
+
+env_vars = dotenv_values(".env")
+
+# Rows shown in the import report.
+ReportRows = int(env_vars.get("ProfileStartupRows") or 25)
+
+# The window should be up within this on a cold start.
+TargetSeconds = 1.0
+
+
+class ImportProfiler:
+    """Times every new module imported on the thread that installed it."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.records = []    # (module, self seconds, cumulative seconds, depth)
+        self._stack = []     # Time spent in nested imports, one entry per open import
+        self._original = None
+        self._thread = None
+
+    def install(self):
+        if self._original is None:
+            self._original = builtins.__import__
+            self._thread = threading.get_ident()
+            builtins.__import__ = self._import
+
+    def uninstall(self):
+        if self._original is not None:
+            builtins.__import__ = self._original
+            self._original = None
+
+    # Name of the module an import statement would load, or None if it is already loaded.
+    @staticmethod
+    def _target(name, globals, fromlist, level):
+        if level:
+            package = (globals or {}).get("__package__") or ""
+            base = package.rsplit(".", level - 1)[0] if level > 1 else package
+            name = f"{base}.{name}" if name else base
+        if name not in sys.modules:
+            return name
+        for item in fromlist or ():
+            if item != "*" and f"{name}.{item}" not in sys.modules and not hasattr(sys.modules[name], item):
+                return f"{name}.{item}"
+        return None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        target = None
+        if threading.get_ident() == self._thread:
+            target = self._target(name, globals, fromlist, level)
+        if target is None:
+            return self._original(name, globals, locals, fromlist, level)
+
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            self.records.append((target, elapsed - nested, elapsed, len(self._stack)))
+
+    def report(self, rows=ReportRows):
+        total = sum(cumulative for _, _, cumulative, depth in self.records if depth == 0)
+        print(f"[startup] {len(self.records)} modules imported in {total * 1000:.0f} ms")
+        print(f"[startup] {'self ms':>8} {'cumulative ms':>14}  module")
+        for module, own, cumulative, depth in sorted(self.records, key=lambda r: r[2], reverse=True)[:rows]:
+            print(f"[startup] {own * 1000:8.1f} {cumulative * 1000:14.1f}  {'  ' * depth}{module}")
+
+    # Called once the GUI has drawn its first frame.
+    def first_frame(self):
+        self.uninstall()
+        elapsed = time.perf_counter() - self.started
+        self.report()
+        verdict = "within" if elapsed <= TargetSeconds else "over"
+        print(f"[startup] first GUI frame after {elapsed * 1000:.0f} ms ({verdict} the {TargetSeconds * 1000:.0f} ms target)")
+
+
+def StartupProfiler():
+    """An installed ImportProfiler if profiling was asked for, otherwise None."""
+    if "--profile-startup" not in sys.argv and str(env_vars.get("ProfileStartup", "False")).lower() != "true":
+        return None
+    profiler = ImportProfiler()
+    profiler.install()
+    return profiler
+
+
+# Import the provider SDKs, create their clients and warm the audio cache on
+# a background thread unless PrewarmClients=False.
+def PrewarmBackends():
+    if str(env_vars.get("PrewarmClients", "True")).lower() == "false":
+        return None
+
+    def warm():
+        from Backend.Model import GetCohere, GetOfflineModel
+        from Backend.Chatbot import GetClient as GetGeminiClient
+        from Backend.RealtimeSearchEngine import GetClient as GetGroqClient
+        from Backend.WebSearch import GetSession as GetSearchSession
+        from Backend.TextToSpeech import Output, WarmAudioCache
+
+        for name, prepare in (("Cohere", GetCohere), ("intent model", GetOfflineModel),
+                              ("Gemini", GetGeminiClient), ("Groq", GetGroqClient),
+                              ("web search", GetSearchSession), ("audio output", Output.start),
+                              ("audio cache", WarmAudioCache)):
+            try:
+                prepare()
+            except Exception as e:
+                print(f"Error preparing {name}: {e}")
+
+    thread = threading.Thread(target=warm, daemon=True)
+    thread.start()
+    return thread
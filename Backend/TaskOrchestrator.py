@@ -0,0 +1,232 @@
+# Concurrent execution of the tasks in one decision.
+#
+# A decision such as ['open chrome', 'general tell me about gandhi',
+# 'generate image of a lion'] used to be handled one entry at a time, and
+# MainExecution returned after the first answer. Now every entry is submitted
+# to a bounded worker pool as soon as the decision model emits it, so a
+# compound request takes about as long as its slowest task instead of the sum.
+# Answers are still delivered in decision order: the first one streams to the
+# screen while later ones keep generating and are shown when their turn comes.
+#
+# .env settings:
+#   TaskWorkers=4     (tasks running at once)
+#   TaskTimeout=60    (seconds from submission before a task is abandoned)
+#
+# Usage:
+#   python -m Backend.TaskOrchestrator   # benchmark with stand-in tasks
+
+import queue
+import threading
+import time
+from dotenv import dotenv_values
+from Backend.Tracing import CurrentTrace, UseTrace
+
+env_vars = dotenv_values(".env")
+
+Workers = int(env_vars.get("TaskWorkers") or 4)
+TimeoutSeconds = float(env_vars.get("TaskTimeout") or 60)
+
+_Done = object()   # Marks the end of a task's chunk queue.
+
+
+class Task:
+    """One decision entry running on the pool."""
+
+    def __init__(self, name, kind, timeout, streams):
+        self.name = name
+        self.kind = kind
+        self.streams = streams
+        self.deadline = time.monotonic() + timeout
+        self.submitted = time.perf_counter()
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.timed_out = False
+        self.trace = CurrentTrace()   # Spans recorded by the task join the submitter's trace
+        self.done = threading.Event()
+        self.cancelled = threading.Event()
+        self._chunks = queue.Queue()
+
+    def remaining(self):
+        return max(0.0, self.deadline - time.monotonic())
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def _expire(self):
+        if not self.timed_out:
+            self.timed_out = True
+            self.cancel()
+            print(f"Task timed out: {self.name}")
+
+    # Block until the task has finished; False if its deadline passed first.
+    def wait(self):
+        if self.done.wait(self.remaining()):
+            return True
+        self._expire()
+        return False
+
+    # Chunks of a streaming task as they are produced, up to its deadline.
+    def chunks(self):
+        while True:
+            try:
+                chunk = self._chunks.get(timeout=self.remaining())
+            except queue.Empty:
+                self._expire()
+                return
+            if chunk is _Done:
+                return
+            yield chunk
+
+
+class TaskGroup:
+    """The tasks of one decision, kept in the order they were submitted."""
+
+    def __init__(self, orchestrator):
+        self.orchestrator = orchestrator
+        self.tasks = []
+
+    def submit(self, name, func, *args, **options):
+        task = self.orchestrator.submit(name, func, *args, **options)
+        self.tasks.append(task)
+        return task
+
+    # Adopt a task that was submitted before the decision was known.
+    def add(self, task):
+        self.tasks.append(task)
+        return task
+
+    # Streaming tasks in submission order, for showing and speaking answers.
+    def answers(self):
+        return [task for task in self.tasks if task.streams]
+
+    def wait(self):
+        return all([task.wait() for task in self.tasks])
+
+
+class TaskOrchestrator:
+    """
+    Bounded pool of daemon worker threads. limits caps how many tasks of one
+    kind may run at once, for backends that are not safe to call concurrently.
+    """
+
+    def __init__(self, workers=Workers, timeout=TimeoutSeconds, limits=None):
+        self.workers = workers
+        self.timeout = timeout
+        self.limits = {kind: threading.Semaphore(n) for kind, n in (limits or {}).items()}
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._worker, daemon=True, name=f"task-{len(self._threads)}")
+                thread.start()
+                self._threads.append(thread)
+
+    def group(self):
+        return TaskGroup(self)
+
+    # Run func(*args) on the pool. With streams=True, func returns an iterable
+    # of text chunks that can be read with task.chunks() while it is running.
+    def submit(self, name, func, *args, kind=None, timeout=None, streams=False):
+        self._start()
+        task = Task(name, kind, self.timeout if timeout is None else timeout, streams)
+        self._queue.put((task, func, args))
+        return task
+
+    def _worker(self):
+        while True:
+            task, func, args = self._queue.get()
+            self._run(task, func, args)
+
+    def _run(self, task, func, args):
+        UseTrace(task.trace)
+        limit = self.limits.get(task.kind)
+        try:
+            if limit is not None and not limit.acquire(timeout=task.remaining()):
+                task._expire()
+                return
+            try:
+                if task.cancelled.is_set():
+                    return
+                if task.streams:
+                    task.result = self._stream(task, func(*args))
+                else:
+                    task.result = func(*args)
+            finally:
+                if limit is not None:
+                    limit.release()
+        except Exception as e:
+            task.error = e
+            print(f"Error in task {task.name}: {e}")
+        finally:
+            task.finished = time.perf_counter()
+            task._chunks.put(_Done)
+            task.done.set()
+
+    @staticmethod
+    def _stream(task, chunks):
+        parts = []
+        try:
+            for chunk in chunks:
+                if task.cancelled.is_set():
+                    break
+                parts.append(chunk)
+                task._chunks.put(chunk)
+        finally:
+            # Let an abandoned generator run its cleanup now.
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+        return "".join(parts)
+
+
+def Benchmark():
+    # Stand-ins for one compound request: an app launch, two answers and an image request.
+    def automation():
+        time.sleep(0.8)
+        return True
+
+    def answer(words, delay):
+        for word in words.split():
+            time.sleep(delay)
+            yield word + " "
+
+    def image():
+        time.sleep(0.2)
+        return True
+
+    decision = [
+        ("open chrome", automation, (), {}),
+        ("general tell me about gandhi", answer, ("Gandhi led India's independence movement with nonviolence.", 0.15), {"streams": True}),
+        ("realtime weather in delhi", answer, ("It is 31 degrees and sunny in Delhi.", 0.12), {"streams": True}),
+        ("generate image of a lion", image, (), {}),
+    ]
+
+    start = time.perf_counter()
+    for name, func, args, options in decision:
+        result = func(*args)
+        if options.get("streams"):
+            "".join(result)
+    serial = time.perf_counter() - start
+
+    orchestrator = TaskOrchestrator(workers=4)
+    start = time.perf_counter()
+    group = orchestrator.group()
+    for name, func, args, options in decision:
+        group.submit(name, func, *args, **options)
+    for task in group.answers():
+        "".join(task.chunks())
+    group.wait()
+    concurrent = time.perf_counter() - start
+
+    slowest = max(task.finished - task.submitted for task in group.tasks)
+    print(f"Sequential           {serial * 1000:7.1f} ms")
+    print(f"Orchestrated         {concurrent * 1000:7.1f} ms")
+    print(f"Slowest single task  {slowest * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    Benchmark()
@@ -1,93 +1,219 @@
-import pygame      # Import pygame library for handling audio playback
 import random      # Import random for generating random choices
 import asyncio     # Import asyncio for asynchronous operations
-import edge_tts    # Import edge_tts for text-to-speech functionality
-import os          # Import os for file path handling
+import io          # Import io for in-memory audio buffers
+import queue       # Import queue for the playback queue
 from dotenv import dotenv_values  # Import dotenv for reading environment variables
+import threading   # Import threading for the playback service and cache warm-up
+from Backend.SpeechPipeline import SpeechPipeline, SentenceBuffer, SplitSentences
+from Backend.AudioCache import AudioCache
+from Backend.Tracing import Span
 
 
 # Load environment variables from a .env file
 env_vars = dotenv_values(".env")
 AssistantVoice = env_vars.get("AssistantVoice")  # Get the AssistantVoice from the environment
 
-# Asynchronous function to convert text to an audio file
-async def TextToAudioFile(text) -> None:
-    file_path = r"Data\speech.mp3"
+# Voice settings, also part of the audio cache key
+Pitch = "+5Hz"
+Rate = "+13%"
 
-    # Delete old file
-    if os.path.exists(file_path):
-        os.remove(file_path)
+# Longest a caller waits for one clip to be played before giving up on it.
+PlayTimeout = float(env_vars.get("PlaybackTimeout") or 60)
+
+# Synthesized audio reused across calls and restarts
+Cache = AudioCache(max_bytes=int(env_vars.get("AudioCacheBytes") or 50 * 1024 * 1024))
+
+# Canned lines spoken instead of reading out long answers.
+responses = [
+    "The rest of the result has been printed to the chat screen, kindly check it out sir.",
+    "The rest of the text is now on the chat screen, sir, please check it.",
+    "You can see the rest of the text on the chat screen, sir.",
+    "The remaining part of the text is now on the chat screen, sir.",
+    "Sir, you'll find more text on the chat screen for you to see.",
+    "The rest of the answer is now on the chat screen, sir.",
+    "Sir, please look at the chat screen, the rest of the answer is there.",
+    "You'll find the complete answer on the chat screen, sir.",
+    "The next part of the text is on the chat screen, sir.",
+    "Sir, please check the chat screen for more information.",
+    "There's more text on the chat screen for you, sir.",
+    "Sir, take a look at the chat screen for additional text.",
+    "You'll find more to read on the chat screen, sir.",
+    "Sir, check the chat screen for the rest of the text.",
+    "The chat screen has the rest of the text, sir.",
+    "There's more to see on the chat screen, sir, please look.",
+    "Sir, the chat screen holds the continuation of the text.",
+    "You'll find the complete answer on the chat screen, kindly check it out sir.",
+    "Please review the chat screen for the rest of the text, sir.",
+    "Sir, look at the chat screen for the complete answer."
+]
+
+# Number of sentences read out before a long answer is cut short.
+SpokenSentences = 2
+
+# Asynchronous function to synthesize text straight into memory
+async def TextToAudioBytes(text) -> bytes:
+    import edge_tts    # Imported on first synthesis to keep startup fast
 
-    # Generate speech file
     communicate = edge_tts.Communicate(
         text,
         AssistantVoice,
-        pitch="+5Hz",
-        rate="+13%"
+        pitch=Pitch,
+        rate=Rate
     )
 
-    await communicate.save(file_path)
-  
+    buffer = io.BytesIO()
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            buffer.write(chunk["data"])
+    return buffer.getvalue()
 
-def TTS(Text, func=lambda r=None: True):
-    while True:
-        try:
-            # Convert text to an audio file asynchronously
-            asyncio.run(TextToAudioFile(Text))
 
-            # Initialize pygame mixer for audio playback
-            pygame.mixer.init()
+# Synthesize one sentence into an in-memory MP3 clip.
+def SynthesizeClip(text):
+    with Span("tts_synthesis", chars=len(text)) as span:
 
-            # Load the generated speech file into pygame mixer
-            pygame.mixer.music.load(r"Data\speech.mp3")
-            pygame.mixer.music.play()  # Play the audio
+        # Cached phrases are played without touching the network
+        data = Cache.get(text, AssistantVoice, Pitch, Rate)
+        span["cached"] = data is not None
+        if data is not None:
+            return data
 
-                # Loop until the audio is done playing or the function stops
-            while pygame.mixer.music.get_busy():
-                if func() == False:  # Check if the external function returns False
-                    break
-                pygame.time.Clock().tick(10)  # Limit the loop to 10 ticks per second
+        data = asyncio.run(TextToAudioBytes(text))
+        Cache.put(text, AssistantVoice, Pitch, Rate, data)
+        return data
 
-            return True  # Return True if the audio played successfully
-        
-        except Exception as e:  # Handle any exceptions during the process
-            print(f"Error in TTS: {e}")
 
-        finally:
+# Synthesize the canned responses into the cache so they never need the network.
+def WarmAudioCache(texts=None):
+    def warm():
+        for text in texts or responses:
+            if Cache.contains(text, AssistantVoice, Pitch, Rate):
+                continue
+            try:
+                Cache.put(text, AssistantVoice, Pitch, Rate, asyncio.run(TextToAudioBytes(text)))
+            except Exception as e:
+                print(f"Error warming audio cache: {e}")
+
+    thread = threading.Thread(target=warm, daemon=True)
+    thread.start()
+    return thread
+
+
+# Hit rate and bytes stored in the audio cache.
+def AudioCacheStats():
+    return Cache.stats()
+
+
+class AudioOutput:
+    """
+    Long-lived playback service. The pygame mixer is initialized once on the
+    playback thread and clips arrive as in-memory MP3 buffers, queued so that
+    overlapping speech requests play one after another instead of fighting
+    over a shared file.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.error = None   # Why the mixer could not be started last time, if it failed
+
+    # Start the playback thread (and import pygame on it) if it is not running yet.
+    def start(self):
+        with self._lock:
+            self._start()
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        try:
+            import pygame      # Imported here so pygame never loads on the startup path
+            pygame.mixer.init()   # Initialize the mixer once for the process lifetime
+            clock = pygame.time.Clock()
+        except Exception as e:
+            # No audio (e.g. no output device): fail every waiting clip and let
+            # the next play() start a new thread to try again.
+            print(f"Error starting audio output: {e}")
+            with self._lock:
+                self.error = e
+                self._thread = None
+                while not self._queue.empty():
+                    self._queue.get()[2].put(False)
+            return
+
+        self.error = None
+        while True:
+            data, func, done = self._queue.get()
+            result = True
             try:
-                # Call the provided function with False to signal the end of TTS
-                func(False)
-                pygame.mixer.music.stop()   # Stop the audio playback
-                pygame.mixer.quit()         # Quit the pygame mixer
+                pygame.mixer.music.load(io.BytesIO(data), "mp3")
+                pygame.mixer.music.play()  # Play the audio
+
+                # Loop until the audio is done playing or the function stops
+                while pygame.mixer.music.get_busy():
+                    if func() == False:  # Check if the external function returns False
+                        pygame.mixer.music.stop()
+                        result = False
+                        break
+                    clock.tick(10)  # Limit the loop to 10 ticks per second
 
+                pygame.mixer.music.unload()
             except Exception as e:
-                 print(f"Error in TTS: {e}")
+                print(f"Error in TTS: {e}")
+            done.put(result)
+
+    # Queue a clip and block until it has been played; False if func stopped it.
+    def play(self, data, func=lambda r=None: True):
+        if not data:
+            return True
+        done = queue.Queue(maxsize=1)
+        with self._lock:
+            self._start()
+            self._queue.put((data, func, done))
+        try:
+            return done.get(timeout=PlayTimeout)
+        except queue.Empty:
+            print("Error in TTS: playback timed out")
+            return False
+
+
+# Shared playback service
+Output = AudioOutput()
+
+
+# Play one clip; returns False if func asked to stop early.
+def PlayClip(data, func):
+    with Span("playback"):
+        return Output.play(data, func)
+
+
+def TTS(Text, func=lambda r=None: True):
+    try:
+        # Synthesize sentence by sentence, playing each one as soon as it is ready
+        pipeline = SpeechPipeline(SynthesizeClip, PlayClip, func)
+        for sentence in SplitSentences(Text):
+            pipeline.speak(sentence)
+        pipeline.close()
+
+        return pipeline.wait()  # Return True if the audio played successfully
+
+    except Exception as e:  # Handle any exceptions during the process
+        print(f"Error in TTS: {e}")
+
+    finally:
+        try:
+            # Call the provided function with False to signal the end of TTS
+            func(False)
+
+        except Exception as e:
+             print(f"Error in TTS: {e}")
 
 
 def TextToSpeech(Text, func=lambda r=None: True):
     Data = str(Text).split(".")  # Split the text by periods into a list of sentences
-    responses = [
-        "The rest of the result has been printed to the chat screen, kindly check it out sir.",
-        "The rest of the text is now on the chat screen, sir, please check it.",
-        "You can see the rest of the text on the chat screen, sir.",
-        "The remaining part of the text is now on the chat screen, sir.",
-        "Sir, you'll find more text on the chat screen for you to see.",
-        "The rest of the answer is now on the chat screen, sir.",
-        "Sir, please look at the chat screen, the rest of the answer is there.",
-        "You'll find the complete answer on the chat screen, sir.",
-        "The next part of the text is on the chat screen, sir.",
-        "Sir, please check the chat screen for more information.",
-        "There's more text on the chat screen for you, sir.",
-        "Sir, take a look at the chat screen for additional text.",
-        "You'll find more to read on the chat screen, sir.",
-        "Sir, check the chat screen for the rest of the text.",
-        "The chat screen has the rest of the text, sir.",
-        "There's more to see on the chat screen, sir, please look.",
-        "Sir, the chat screen holds the continuation of the text.",
-        "You'll find the complete answer on the chat screen, kindly check it out sir.",
-        "Please review the chat screen for the rest of the text, sir.",
-        "Sir, look at the chat screen for the complete answer."
-    ]
 
     # If the text is very long (more than 4 sentences and 250 characters), add a response message
     if len(Data) > 4 and len(Text) > 250:
@@ -98,8 +224,51 @@ def TextToSpeech(Text, func=lambda r=None: True):
         TTS(Text, func)
 
 
+class StreamingSpeech:
+    """
+    Speaks an answer while it is still being generated. Feed it the streamed
+    chunks; the first sentences are spoken right away and finish() applies the
+    same long-answer rule as TextToSpeech once the whole text is known.
+    """
+
+    def __init__(self, func=lambda r=None: True):
+        self.func = func
+        self.text = ""
+        self.buffer = SentenceBuffer()
+        self.spoken = 0
+        self.held = []
+        self.pipeline = SpeechPipeline(SynthesizeClip, PlayClip, func)
+
+    def feed(self, chunk):
+        self.text += chunk
+        for sentence in self.buffer.feed(chunk):
+            if self.spoken < SpokenSentences:
+                self.pipeline.speak(sentence)
+                self.spoken += 1
+            else:
+                self.held.append(sentence)
+
+    # Speak whatever is left and block until playback is finished.
+    def finish(self):
+        try:
+            self.held += self.buffer.flush()
+
+            if len(self.text.split(".")) > 4 and len(self.text) > 250:
+                self.pipeline.speak(random.choice(responses))
+            else:
+                for sentence in self.held:
+                    self.pipeline.speak(sentence)
+
+            self.pipeline.close()
+            return self.pipeline.wait()
+
+        finally:
+            try:
+                self.func(False)
+            except Exception as e:
+                print(f"Error in TTS: {e}")
+
+
 if __name__ == "__main__":
     while True:
         TextToSpeech(input("Enter the text: "))
-    
-
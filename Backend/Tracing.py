@@ -0,0 +1,221 @@
+# Per-stage latency tracing for the voice pipeline.
+#
+# Stages are timed with Span() (or Record() for durations measured by hand),
+# kept in an in-process store of recent samples per stage, and appended to a
+# rotating JSONL file so latency can be compared across runs. Spans belonging
+# to one query share a trace id: StartTrace() begins a trace on the current
+# thread and UseTrace() carries it over to worker threads.
+#
+# Stages recorded:
+#   execution          whole MainExecution, from listening to the last answer spoken
+#   speech_input       waiting for and recognizing the query
+#   decision           FirstLayerDMM, until the whole decision is known
+#   search             GoogleSearch for a realtime answer (cached=True|False)
+#   search_enrichment  fetching the top result pages for titles and snippets
+#   llm_first_token    request sent to the first chunk of the answer (provider=...)
+#   llm_complete       request sent to the end of the answer (provider=...)
+#   tts_synthesis      one sentence synthesized (cached=True|False)
+#   playback           one clip queued and played
+#
+# .env settings:
+#   Tracing=True
+#   TraceFile=Data/Trace.jsonl
+#   TraceFileBytes=5242880     (rotate when the file grows past this)
+#   TraceFileBackups=3         (rotated files kept: Trace.jsonl.1 ... .3)
+#
+# Usage:
+#   python -m Backend.Tracing [report] [file]   # p50/p95/p99 per stage from the trace files
+
+import json
+import math
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from dotenv import dotenv_values
+
+env_vars = dotenv_values(".env")
+
+Enabled = str(env_vars.get("Tracing", "True")).lower() != "false"
+TraceFile = env_vars.get("TraceFile") or r"Data/Trace.jsonl"
+MaxBytes = int(env_vars.get("TraceFileBytes") or 5 * 1024 * 1024)
+Backups = int(env_vars.get("TraceFileBackups") or 3)
+
+# Recent samples kept per stage for in-process percentiles.
+Samples = 2000
+
+_local = threading.local()
+
+
+def StartTrace():
+    """Begin a new trace on this thread and return its id."""
+    _local.trace = uuid.uuid4().hex[:12]
+    return _local.trace
+
+
+def CurrentTrace():
+    return getattr(_local, "trace", None)
+
+
+def UseTrace(trace):
+    """Attach this thread to an existing trace (e.g. one started on another thread)."""
+    _local.trace = trace
+
+
+# Histogram name of a sample: LLM stages are kept apart per provider.
+def StageKey(stage, provider=None):
+    return f"{stage}:{provider}" if provider else stage
+
+
+def Percentile(values, share):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    rank = max(1, min(len(values), math.ceil(share * len(values))))
+    return values[rank - 1]
+
+
+def Summarize(samples):
+    """count, mean, p50, p95, p99 and max (ms) for each stage in {stage: [ms, ...]}."""
+    summary = {}
+    for stage, values in samples.items():
+        values = sorted(values)
+        summary[stage] = {
+            "count": len(values),
+            "mean": sum(values) / len(values) if values else 0.0,
+            "p50": Percentile(values, 0.50),
+            "p95": Percentile(values, 0.95),
+            "p99": Percentile(values, 0.99),
+            "max": values[-1] if values else 0.0,
+        }
+    return summary
+
+
+def FormatSummary(summary):
+    lines = [f"{'stage':<24} {'count':>6} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}"]
+    for stage, s in sorted(summary.items()):
+        lines.append(f"{stage:<24} {s['count']:>6} {s['mean']:>9.1f} {s['p50']:>9.1f} "
+                     f"{s['p95']:>9.1f} {s['p99']:>9.1f} {s['max']:>9.1f}")
+    lines.append("(all times in ms)")
+    return "\n".join(lines)
+
+
+class Tracer:
+    """In-process latency samples per stage plus a rotating JSONL export."""
+
+    def __init__(self, path=TraceFile, max_bytes=MaxBytes, backups=Backups, samples=Samples, enabled=Enabled):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.enabled = enabled
+        self.samples = defaultdict(lambda: deque(maxlen=samples))
+        self._file = None
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, **attrs):
+        if not self.enabled:
+            return
+        ms = seconds * 1000
+        entry = {"time": round(time.time(), 3), "trace": CurrentTrace(), "stage": stage, "ms": round(ms, 2)}
+        entry.update(attrs)
+        with self._lock:
+            self.samples[StageKey(stage, attrs.get("provider"))].append(ms)
+            if self.path:
+                self._write(json.dumps(entry, ensure_ascii=False))
+
+    @contextmanager
+    def span(self, stage, **attrs):
+        """Time the enclosed block; attrs can still be added to the yielded dict."""
+        start = time.perf_counter()
+        try:
+            yield attrs
+        except BaseException as e:
+            attrs["error"] = type(e).__name__
+            raise
+        finally:
+            self.record(stage, time.perf_counter() - start, **attrs)
+
+    def _write(self, line):
+        try:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line + "\n")
+            self._file.flush()
+            if self._file.tell() >= self.max_bytes:
+                self._rotate()
+        except OSError as e:
+            print(f"Error writing trace: {e}")
+
+    # Trace.jsonl -> Trace.jsonl.1 -> ... -> Trace.jsonl.<backups>, oldest dropped.
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        for n in range(self.backups, 0, -1):
+            source = self.path if n == 1 else f"{self.path}.{n - 1}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{n}")
+        if self.backups <= 0:
+            os.remove(self.path)
+
+    def stats(self):
+        with self._lock:
+            return Summarize({stage: list(values) for stage, values in self.samples.items()})
+
+    def reset(self):
+        with self._lock:
+            self.samples.clear()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+Traces = Tracer()
+
+
+def Span(stage, **attrs):
+    return Traces.span(stage, **attrs)
+
+
+def Record(stage, seconds, **attrs):
+    Traces.record(stage, seconds, **attrs)
+
+
+def TraceStats():
+    return Traces.stats()
+
+
+# Samples per stage read back from the trace file and its rotated copies.
+def ReadTraceFiles(path=TraceFile):
+    samples = defaultdict(list)
+    for name in [f"{path}.{n}" for n in range(Backups, 0, -1)] + [path]:
+        try:
+            with open(name, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        samples[StageKey(entry["stage"], entry.get("provider"))].append(float(entry["ms"]))
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except FileNotFoundError:
+            continue
+    return samples
+
+
+def Report(path=TraceFile):
+    samples = ReadTraceFiles(path)
+    if not samples:
+        print(f"No traces found in {path}")
+        return
+    print(FormatSummary(Summarize(samples)))
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if a != "report"]
+    Report(args[0] if args else TraceFile)
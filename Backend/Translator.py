@@ -0,0 +1,83 @@
+# Cached translation for speech input.
+#
+# Every mtranslate call is a blocking HTTP request. Translations are kept in an
+# LRU cache keyed by (text, source, target), and text that is already English
+# is detected locally and never sent.
+
+import threading
+from collections import OrderedDict
+import mtranslate as mt
+
+CacheSize = 2048
+
+
+# Plain ASCII text with at least one letter is treated as English; speech in
+# Hindi and most other input languages comes back in its own script.
+def LooksEnglish(text):
+    text = str(text)
+    return text.isascii() and any(c.isalpha() for c in text)
+
+
+class TranslationCache:
+    """LRU cache of (text, source, target) -> translation."""
+
+    def __init__(self, size=CacheSize):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def skip(self):
+        with self._lock:
+            self.skipped += 1
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses, "skipped": self.skipped}
+
+
+Cache = TranslationCache()
+
+
+# True if no request is needed because the text is empty or already English.
+def _skip(text, target):
+    if not str(text).strip() or (target.startswith("en") and LooksEnglish(text)):
+        Cache.skip()
+        return True
+    return False
+
+
+def Translate(text, target="en", source="auto"):
+    if _skip(text, target):
+        return text
+
+    key = (text, source, target)
+    cached = Cache.get(key)
+    if cached is not None:
+        return cached
+
+    translated = mt.translate(text, target, source)
+    Cache.put(key, translated)
+    return translated
+
+
+def TranslationStats():
+    return Cache.stats()
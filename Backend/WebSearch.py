@@ -0,0 +1,215 @@
+# Web search for realtime answers: cached, and enriched with page content.
+#
+# googlesearch only returns bare URLs, so the realtime model used to get five
+# links with "Description: Not available" and had to answer from its own
+# knowledge. Now the top result pages are fetched concurrently over a pooled
+# HTTP session (each capped in bytes and time) and their title and a short
+# text snippet are sent instead. Results are cached by normalized query for a
+# few minutes, so a repeated realtime question only waits for the LLM.
+#
+# .env settings:
+#   SearchResults=5           (results asked from Google)
+#   SearchEnrichPages=5       (of those, pages fetched for a title and snippet)
+#   SearchCacheSeconds=600    (how long results are reused)
+#   SearchRetrySeconds=30     (how long results are reused when no page could be read)
+#   SearchPageBytes=262144    (bytes read from a page at most)
+#   SearchPageSeconds=2       (seconds spent on a page at most)
+#
+# Usage:
+#   python -m Backend.WebSearch "query"   # cold and cached timings plus the results
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dotenv import dotenv_values
+from Backend.DecisionCache import TTLCache
+from Backend.Tracing import Span
+
+env_vars = dotenv_values(".env")
+
+Results = int(env_vars.get("SearchResults") or 5)
+EnrichPages = int(env_vars.get("SearchEnrichPages") or 5)
+CacheSeconds = float(env_vars.get("SearchCacheSeconds") or 600)
+RetrySeconds = float(env_vars.get("SearchRetrySeconds") or 30)
+PageBytes = int(env_vars.get("SearchPageBytes") or 256 * 1024)
+PageSeconds = float(env_vars.get("SearchPageSeconds") or 2)
+
+MaxEntries = 256
+SnippetChars = 400
+TitleChars = 150
+
+UserAgent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.4896.75 Safari/537.36'
+
+
+# Normalized query -> search results.
+Cache = TTLCache(CacheSeconds, MaxEntries)
+
+# HTTP session and page fetch pool, created on first use.
+session = None
+pool = None
+_client_lock = threading.Lock()
+
+
+def GetSession():
+    global session
+    with _client_lock:
+        if session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            session.headers["User-Agent"] = UserAgent
+            adapter = HTTPAdapter(pool_connections=EnrichPages * 2, pool_maxsize=EnrichPages * 2)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        return session
+
+
+def GetPool():
+    global pool
+    with _client_lock:
+        if pool is None:
+            pool = ThreadPoolExecutor(max_workers=EnrichPages * 2, thread_name_prefix="search")
+        return pool
+
+
+# Start of an HTML page, at most PageBytes and PageSeconds, or None.
+def FetchPage(url, max_bytes=PageBytes, seconds=PageSeconds):
+    deadline = time.monotonic() + seconds
+    try:
+        with GetSession().get(url, stream=True, timeout=seconds) as response:
+            content_type = response.headers.get("Content-Type", "")
+            if response.status_code != 200 or "html" not in content_type:
+                return None
+            # read1 returns after a single socket read (each bounded by the
+            # timeout), so a server trickling data cannot hold the read past
+            # the deadline. read() waits for the whole block and is only used
+            # with urllib3 versions that lack read1.
+            read = getattr(response.raw, "read1", None) or response.raw.read
+            blocks = []
+            size = 0
+            while size < max_bytes and time.monotonic() < deadline:
+                block = read(16384, decode_content=True)
+                if not block:
+                    break
+                blocks.append(block)
+                size += len(block)
+            encoding = response.encoding if "charset" in content_type else "utf-8"
+            return b"".join(blocks)[:max_bytes].decode(encoding, errors="replace")
+    except Exception:
+        return None
+
+
+def Shorten(text, limit):
+    text = " ".join(text.split())
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + "..."
+
+
+# (title, snippet) of a page: its meta description, or else its first paragraphs.
+def ExtractSummary(html):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+
+    title = ""
+    tag = soup.find("meta", property="og:title")
+    if tag and tag.get("content"):
+        title = tag["content"]
+    elif soup.title and soup.title.string:
+        title = soup.title.string
+
+    snippet = ""
+    for attrs in ({"name": "description"}, {"property": "og:description"}):
+        tag = soup.find("meta", attrs=attrs)
+        if tag and tag.get("content"):
+            snippet = tag["content"]
+            break
+
+    if len(snippet) < SnippetChars // 2:
+        for tag in soup(["script", "style", "noscript", "nav", "header", "footer"]):
+            tag.decompose()
+        paragraphs = [p.get_text(" ", strip=True) for p in soup.find_all("p")]
+        text = " ".join(p for p in paragraphs if len(p) > 40)
+        snippet = f"{snippet} {text}".strip()
+
+    return Shorten(title, TitleChars), Shorten(snippet, SnippetChars)
+
+
+def EnrichResult(url):
+    html = FetchPage(url)
+    title, snippet = ExtractSummary(html) if html else ("", "")
+    return {"url": url, "title": title, "snippet": snippet}
+
+
+# Fetch the top pages at once; pages not done within PageSeconds keep only their URL.
+def EnrichResults(urls, pages=EnrichPages):
+    results = [{"url": url, "title": "", "snippet": ""} for url in urls]
+    if pages <= 0 or not urls:
+        return results
+
+    with Span("search_enrichment", pages=min(pages, len(urls))) as span:
+        futures = {GetPool().submit(EnrichResult, url): n for n, url in enumerate(urls[:pages])}
+        done, pending = wait(futures, timeout=PageSeconds + 0.5)
+        # Pages still queued behind other searches are not fetched for nothing.
+        for future in pending:
+            future.cancel()
+        for future in done:
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                print(f"Error reading search result: {e}")
+        span["enriched"] = sum(1 for r in results if r["snippet"])
+    return results
+
+
+def SearchWeb(query, count=Results):
+    """Search results for query as [{"url", "title", "snippet"}], cached for CacheSeconds (RetrySeconds if no page was read)."""
+    with Span("search") as span:
+        results = Cache.get(query)
+        span["cached"] = results is not None
+        if results is not None:
+            return results
+
+        from googlesearch import search
+
+        urls = []
+        for url in search(query, num_results=count):
+            if url not in urls:
+                urls.append(url)
+            if len(urls) == count:
+                break
+
+        results = EnrichResults(urls)
+
+        # Bare URLs are kept only briefly so the pages are tried again soon.
+        enriched = any(result["snippet"] for result in results)
+        Cache.put(query, results, ttl=None if enriched else RetrySeconds)
+        span["enriched"] = enriched
+        return results
+
+
+# Search results in the block the realtime model is given.
+def FormatResults(query, results):
+    text = f"The search results for '{query}' are:\n[start]\n"
+    for result in results:
+        if result["title"]:
+            text += f"Title: {result['title']}\n"
+        text += f"URL: {result['url']}\n"
+        text += f"Description: {result['snippet'] or 'Not available'}\n\n"
+    return text + "[end]"
+
+
+def SearchCacheStats():
+    return Cache.stats()
+
+
+if __name__ == "__main__":
+    import sys
+
+    query = " ".join(sys.argv[1:]) or "latest technology news"
+    for attempt in ("cold", "cached"):
+        start = time.perf_counter()
+        results = SearchWeb(query)
+        print(f"{attempt:<7} {(time.perf_counter() - start) * 1000:8.1f} ms")
+    print(FormatResults(query, results))
@@ -2,8 +2,9 @@
 # A Tkinter-based "JARVIS" GUI with hologram animation and a mic button.
 # Provides the functions imported by Main.py:
 # GraphicalUserInterface, SetAssistantStatus, ShowTextToScreen,
+# ShowPartialTextToScreen, EndPartialText,
 # TempDirectoryPath, SetMicrophoneStatus, AnswerModifier, QueryModifier,
-# GetMicrophoneStatus, GetAssistantStatus
+# GetMicrophoneStatus, WaitForMicrophoneStatus, GetAssistantStatus
 
 import os
 import threading
@@ -38,6 +39,7 @@ for p in (RESPONSES_FILE, DATABASE_FILE, MIC_FILE):
 _ui_queue = queue.Queue()  # for thread-safe requests to UI
 _gui_instance = None       # will hold instance of GraphicalUI once started
 _state_lock = threading.Lock()
+_mic_changed = threading.Condition(_state_lock)  # notified whenever the mic status is set
 
 # GUI managed state (strings)
 _assistant_status = "Available..."
@@ -61,6 +63,7 @@ def SetMicrophoneStatus(value: str):
     global _microphone_status
     with _state_lock:
         _microphone_status = str(value)
+        _mic_changed.notify_all()
     try:
         MIC_FILE.write_text(str(value), encoding="utf-8")
     except Exception:
@@ -74,6 +77,15 @@ def GetMicrophoneStatus() -> str:
     with _state_lock:
         return _microphone_status
 
+def WaitForMicrophoneStatus(value: str = "True", timeout=None) -> bool:
+    """
+    Block until the microphone status equals value (returns at once if it already does).
+    Lets worker threads sleep until the mic is toggled instead of polling GetMicrophoneStatus().
+    Returns False if timeout (seconds) expired first.
+    """
+    with _mic_changed:
+        return _mic_changed.wait_for(lambda: _microphone_status == str(value), timeout)
+
 def SetAssistantStatus(status: str):
     """
     Request assistant status update on the GUI (thread-safe).
@@ -105,6 +117,25 @@ def ShowTextToScreen(text: str):
     except Exception:
         pass
 
+def ShowPartialTextToScreen(text: str):
+    """
+    Append a chunk of a streamed answer to the current line of the communication log.
+    The line is started on the first chunk and closed by EndPartialText().
+    Thread-safe: can be called from other threads.
+    """
+    _ui_queue.put(("append_partial", str(text)))
+
+def EndPartialText(text: str = ""):
+    """
+    Close the streamed line in the communication log. `text` is the complete
+    response, written to Responses.data like ShowTextToScreen does.
+    """
+    _ui_queue.put(("end_partial", ""))
+    try:
+        RESPONSES_FILE.write_text(str(text), encoding="utf-8")
+    except Exception:
+        pass
+
 # Simple modifiers used by Main.py (kept intentionally small / safe)
 def AnswerModifier(text: str) -> str:
     """
@@ -155,6 +186,7 @@ class GraphicalUI:
         # animation and queue processing
         self.particles = []
         self._init_particles()
+        self._partial_open = False   # True while a streamed answer is being appended
         self._anim_running = True
 
         # start polling the queue
@@ -356,6 +388,8 @@ class GraphicalUI:
         Supported events:
         - ("assistant_status", status_str)
         - ("append_text", text)
+        - ("append_partial", chunk)
+        - ("end_partial", "")
         - ("mic_status", "True"/"False")
         """
         processed = 0
@@ -371,6 +405,10 @@ class GraphicalUI:
                 self._set_status_label(val)
             elif key == "append_text":
                 self._append_comm_text(val)
+            elif key == "append_partial":
+                self._append_partial_text(val)
+            elif key == "end_partial":
+                self._end_partial_text()
             elif key == "mic_status":
                 self._update_mic_ui(val)
             processed += 1
@@ -398,6 +436,33 @@ class GraphicalUI:
         except Exception:
             pass
 
+    def _append_partial_text(self, text: str):
+        # append a streamed chunk to the open line, starting it with a timestamp if needed
+        try:
+            self.comm_text.configure(state="normal")
+            if not self._partial_open:
+                timestamp = time.strftime("%H:%M:%S")
+                self.comm_text.insert(tk.END, f"[{timestamp}] ")
+                self._partial_open = True
+            self.comm_text.insert(tk.END, text)
+            self.comm_text.see(tk.END)
+            self.comm_text.configure(state="disabled")
+        except Exception:
+            pass
+
+    def _end_partial_text(self):
+        # close the streamed line so the next message starts on its own line
+        if not self._partial_open:
+            return
+        self._partial_open = False
+        try:
+            self.comm_text.configure(state="normal")
+            self.comm_text.insert(tk.END, "\n")
+            self.comm_text.see(tk.END)
+            self.comm_text.configure(state="disabled")
+        except Exception:
+            pass
+
     def _update_mic_ui(self, value: str):
         # toggle mic button visuals based on value string
         val = str(value)
@@ -447,15 +512,18 @@ class GraphicalUI:
 # ---------------------------
 # Public function that Main.py calls
 # ---------------------------
-def GraphicalUserInterface():
+def GraphicalUserInterface(on_ready=None):
     """
     Instantiate the GUI and run its mainloop.
     This function blocks (Main.py expects this behavior).
+    on_ready, if given, is called on the UI thread once the window is up and idle.
     """
     global _gui_instance
     # create instance if not already created
     if _gui_instance is None:
         _gui_instance = GraphicalUI()
+    if on_ready is not None:
+        _gui_instance.root.after_idle(on_ready)
     try:
         _gui_instance.run()
     except Exception:
@@ -0,0 +1,159 @@
+# Headless batch mode: run queries through the assistant without the GUI,
+# microphone or audio, and write one JSON result per query.
+#
+# Each query goes through the same decision -> dispatch -> answer pipeline as
+# Main.py (Backend/Pipeline.py), several at a time with --concurrency. Results
+# are written in input order with the decision, every task's outcome and the
+# timings, so a batch run doubles as a throughput test bed.
+#
+# Input is one query per line, or JSONL with a "query" field, from a file or stdin.
+# With --replay, queries come through SpeechInput() from a replay transcript
+# file instead (Backend/SpeechInput.py), spoken one after another at their
+# recorded pace, so the speech input path runs without a microphone or GUI.
+# Automation commands are only reported (dry run) unless --execute-automation is
+# given, and image generation is skipped. Answers go to their own chat log
+# (Data/HeadlessChatLog.db) unless --chat-log points somewhere else.
+#
+# Usage:
+#   python Headless.py queries.txt > results.jsonl
+#   echo "who was akbar" | python Headless.py
+#   python Headless.py queries.jsonl --concurrency 8 --output results.jsonl --stats
+#   python Headless.py --replay Data/SpeechReplay.txt --replay-speed 0.5 --stats
+
+import argparse
+import contextlib
+import json
+import sys
+import threading
+import time
+
+from Backend.ChatHistory import ChatHistoryStore
+from Backend.SpeechInput import ReplaySpeech, SetSpeechBackend, SpeechInput
+from Backend.TaskOrchestrator import TaskOrchestrator, Workers
+from Backend.Pipeline import RunQuery, Limits
+from Backend.Tracing import StartTrace, Span, Percentile, FormatSummary, TraceStats
+
+DefaultChatLog = r"Data/HeadlessChatLog.db"
+
+
+def ReadQueries(File):
+    for Line in File:
+        Line = Line.strip()
+        if not Line or Line.startswith("#"):
+            continue
+        if Line.startswith("{"):
+            try:
+                Line = json.loads(Line)["query"]
+            except (ValueError, KeyError, TypeError):
+                print(f"Skipping unreadable line: {Line}", file=sys.stderr)
+                continue
+        yield Line
+
+
+# Queries heard through SpeechInput() until the replay backend is done.
+def ReplayQueries(Backend):
+    SetSpeechBackend(Backend)
+    while not Backend.exhausted:
+        Query = SpeechInput()
+        if Query:
+            yield Query
+
+
+class OrderedWriter:
+    """Writes results in input order while queries finish in any order."""
+
+    def __init__(self, Output):
+        self.Output = Output
+        self.Pending = {}
+        self.Next = 0
+        self.Lock = threading.Lock()
+
+    def write(self, Index, Result):
+        with self.Lock:
+            self.Pending[Index] = Result
+            while self.Next in self.Pending:
+                self.Output.write(json.dumps(self.Pending.pop(self.Next), ensure_ascii=False) + "\n")
+                self.Output.flush()
+                self.Next += 1
+
+
+def ProcessQuery(Index, Query, Orchestrator, Store, DryRun, Speculate):
+    StartTrace()
+    try:
+        with Span("execution"):
+            Result = RunQuery(Query, Orchestrator, speak=False, speculate=Speculate, dry_run=DryRun, store=Store)
+    except Exception as e:
+        Result = {"query": Query, "error": str(e)}
+    Result["index"] = Index
+    return Result
+
+
+def Main():
+    parser = argparse.ArgumentParser(description="Run JARVIS queries without the GUI and write JSONL results.")
+    parser.add_argument("input", nargs="?", help="query file (text lines or JSONL); stdin by default")
+    parser.add_argument("--replay", metavar="FILE", help="take queries from a speech replay file through SpeechInput()")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="multiplier on replay delays; 0 replays instantly")
+    parser.add_argument("--output", help="result file; stdout by default")
+    parser.add_argument("--concurrency", type=int, default=1, help="queries processed at once")
+    parser.add_argument("--execute-automation", action="store_true", help="really run automation commands")
+    parser.add_argument("--speculate", action="store_true", help="start answers speculatively during the decision")
+    parser.add_argument("--chat-log", default=DefaultChatLog, help="chat log database used for context and answers")
+    parser.add_argument("--fresh", action="store_true", help="clear the chat log before starting")
+    parser.add_argument("--stats", action="store_true", help="print per-stage latency percentiles at the end")
+    args = parser.parse_args()
+    if args.replay and args.input:
+        parser.error("give either an input file or --replay, not both")
+
+    Store = ChatHistoryStore(path=args.chat_log, legacy_path=None)
+    if args.fresh:
+        Store.clear()
+
+    Orchestrator = TaskOrchestrator(workers=max(Workers, 2 * args.concurrency), limits=Limits)
+    Output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    Writer = OrderedWriter(Output)
+
+    if args.replay:
+        Queries = enumerate(ReplayQueries(ReplaySpeech(args.replay, speed=args.replay_speed)))
+    else:
+        Input = open(args.input, "r", encoding="utf-8") if args.input else sys.stdin
+        Queries = enumerate(ReadQueries(Input))
+    QueriesLock = threading.Lock()
+    Results = []
+
+    def Worker():
+        while True:
+            with QueriesLock:
+                Item = next(Queries, None)
+            if Item is None:
+                return
+            Result = ProcessQuery(*Item, Orchestrator, Store, not args.execute_automation, args.speculate)
+            Results.append(Result)
+            Writer.write(Result["index"], Result)
+
+    Start = time.perf_counter()
+
+    # The pipeline's own progress output goes to stderr so stdout stays valid JSONL.
+    with contextlib.redirect_stdout(sys.stderr):
+        Threads = [threading.Thread(target=Worker, daemon=True) for _ in range(max(1, args.concurrency))]
+        for Thread in Threads:
+            Thread.start()
+        for Thread in Threads:
+            Thread.join()
+
+    Elapsed = time.perf_counter() - Start
+
+    Totals = sorted(r["total_ms"] for r in Results if "total_ms" in r)
+    Errors = sum(1 for r in Results if "error" in r)
+    print(f"{len(Results)} queries ({Errors} failed) in {Elapsed:.2f} s, "
+          f"{len(Results) / Elapsed if Elapsed else 0:.2f} queries/second, "
+          f"p50 {Percentile(Totals, 0.5):.0f} ms, p95 {Percentile(Totals, 0.95):.0f} ms", file=sys.stderr)
+    if args.stats:
+        print(FormatSummary(TraceStats()), file=sys.stderr)
+
+    if args.output:
+        Output.close()
+    Store.close()
+
+
+if __name__ == "__main__":
+    Main()
@@ -1,28 +1,33 @@
+# Imported first so a profiled start (python Main.py --profile-startup) sees every import.
+from Backend.Startup import StartupProfiler, PrewarmBackends
+Profiler = StartupProfiler()
+
 from Frontend.GUI import (
     GraphicalUserInterface,
     SetAssistantStatus,
     ShowTextToScreen,
+    ShowPartialTextToScreen,
+    EndPartialText,
     TempDirectoryPath,
     SetMicrophoneStatus,
     AnswerModifier,
     QueryModifier,
     GetMicrophoneStatus,
+    WaitForMicrophoneStatus,
     GetAssistantStatus
 )
 
-from Backend.Model import FirstLayerDMM
-from Backend.RealtimeSearchEngine import RealtimeSearchEngine
-from Backend.Automation import Automation
-from Backend.SpeechToText import SpeechRecognition
-from Backend.Chatbot import ChatBot
-from Backend.TextToSpeech import TextToSpeech
+from Backend.SpeechInput import SpeechInput, PrewarmSpeechInput
+from Backend.ChatHistory import History
+from Backend.TextToSpeech import StreamingSpeech
+from Backend.TaskOrchestrator import TaskOrchestrator
+from Backend.Speculation import Speculation
+from Backend.Pipeline import Decide, Limits
+from Backend.Tracing import StartTrace, Span
 
 from dotenv import dotenv_values
-from asyncio import run
-from time import sleep
 import subprocess
 import threading
-import json
 import os
 
 env_vars = dotenv_values(".env")
@@ -32,12 +37,14 @@ DefaultMessage = f'''{Username} : Hello {Assistantname}, How are you?
 {Assistantname} : Welcome {Username}. I am doing well. How may I help you?'''
 
 subprocesses = []
-Functions = ["open", "close", "play", "system", "content", "google search", "youtube search"]
+ImageProcess = None
+
+# Runs the tasks of each decision concurrently.
+Orchestrator = TaskOrchestrator(limits=Limits)
 
 
 def ShowDefaultChatIfNoChats():
-    File = open(r"Data/ChatLog.json", "r", encoding="utf-8")
-    if len(File.read()) <= 5:
+    if History.count() == 0:
         with open(TempDirectoryPath("Database.data"), 'w', encoding='utf-8') as file:
             file.write("")
 
@@ -45,9 +52,7 @@ def ShowDefaultChatIfNoChats():
             file.write(DefaultMessage)
 
 def ReadChatLogJson():
-    with open(r"Data/ChatLog.json", "r", encoding='utf-8') as file:
-        chatlog_data = json.load(file)
-    return chatlog_data
+    return History.all()
 
 
 def ChatLogIntegration():
@@ -87,118 +92,113 @@ def InitialExecution():
 
 
 InitialExecution()
+
+
+# Show an answer on the GUI chunk by chunk as it is generated and return the full text.
+# If a StreamingSpeech is given, it starts speaking the first sentences right away.
+def StreamAnswerToScreen(Chunks, Speech=None):
+    ShowPartialTextToScreen(f"{Assistantname} : ")
+    Answer = ""
+    for chunk in Chunks:
+        Answer += chunk
+        ShowPartialTextToScreen(chunk)
+        if Speech is not None:
+            Speech.feed(chunk)
+    Answer = AnswerModifier(Answer)
+    EndPartialText(f"{Assistantname} : {Answer}")
+    return Answer
+
    
-def MainExecution():
+# Hand a prompt to the ImageGeneration.py watcher, starting it if it is not running.
+def StartImageGeneration(Prompt):
+    global ImageProcess
+
+    with open(r"Frontend/Files/ImageGeneration.data", "w") as file:
+        file.write(f"{Prompt},True")
+
+    if ImageProcess is not None and ImageProcess.poll() is None:
+        return True
+
+    try:
+        ImageProcess = subprocess.Popen(
+            ['python', r'Backend\ImageGeneration.py'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            stdin=subprocess.PIPE,
+            shell=False
+        )
+        subprocesses.append(ImageProcess)
+        return True
+
+    except Exception as e:
+        print(f"Error starting ImageGeneration.py: {e}")
+        return False
 
-    TaskExecution = False
-    ImageExecution = False
-    ImageGenerationQuery = ""
+
+def MainExecution():
 
     SetAssistantStatus("Listening...")
-    Query = SpeechRecognition()
+    with Span("speech_input") as span:
+        Query = SpeechInput()
+        span["chars"] = len(Query or "")
+
+    # Nothing was said before the listening timeout.
+    if not Query:
+        return False
+
     ShowTextToScreen(f"{Username} : {Query}")
     SetAssistantStatus("Thinking...")
-    Decision = FirstLayerDMM(Query)
+
+    # Start every task as soon as the decision model emits it, while the rest
+    # of the decision is still being generated; they all run concurrently.
+    # With Speculate=True the chatbot answer starts while Cohere is deciding.
+    Guess = Speculation(Orchestrator, QueryModifier(Query))
+    Decision, Group = Decide(Query, Orchestrator, Guess, image=StartImageGeneration)
 
     print("")
     print(f"Decision : {Decision}")
     print("")
 
-    G = any([i for i in Decision if i.startswith("general")])
-    R = any([i for i in Decision if i.startswith("realtime")])
-
-    Mearged_query = " and ".join(
-        [" ".join(i.split()[1:]) for i in Decision if i.startswith("general") or i.startswith("realtime")]
-    )
-
-    for queries in Decision:
-        if "generate " in queries:
-                ImageGenerationQuery = str(queries)
-                ImageExecution = True
-
-    for queries in Decision:
-        if TaskExecution == False:
-            if any(queries.startswith(func) for func in Functions):
-                run(Automation(list(Decision)))
-                TaskExecution = True
-        if ImageExecution == True:
-
-            with open(r"Frontend/Files/ImageGeneration.data", "w") as file:
-                file.write(f"{ImageGenerationQuery},True")
-
-            try:
-                p1 = subprocess.Popen(
-                    ['python', r'Backend\ImageGeneration.py'],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    stdin=subprocess.PIPE,
-                    shell=False
-                )
-                subprocesses.append(p1)
-
-            except Exception as e:
-                print(f"Error starting ImageGeneration.py: {e}")
-
-        if G or R:
-
-            SetAssistantStatus("Searching...")
-            Answer = RealtimeSearchEngine(QueryModifier(Mearged_query))
-            ShowTextToScreen(f"{Assistantname} : {Answer}")
-            SetAssistantStatus("Answering...")
-            TextToSpeech(Answer)
-            return True
-
-        else:
-
-            for Queries in Decision:
-
-                if "general" in Queries:
-                    SetAssistantStatus("Thinking...")
-                    QueryFinal = Queries.replace("general ", "")
-                    Answer = ChatBot(QueryModifier(QueryFinal))
-                    ShowTextToScreen(f"{Assistantname}: {Answer}")
-                    SetAssistantStatus("Answering.....")
-                    TextToSpeech(Answer)
-                    return True
-
-
-                elif "realtime" in Queries:
-                        SetAssistantStatus("Searching...")
-                        QueryFinal = Queries.replace("realtime ", "")
-                        Answer = RealtimeSearchEngine(QueryModifier(QueryFinal))
-                        ShowTextToScreen(f"{Assistantname} : {Answer}")
-                        SetAssistantStatus("Answering...")
-                        TextToSpeech(Answer)
-                        return True
-
-                elif "exit" in Queries:
-                        QueryFinal = "Okay, Bye!"
-                        Answer = ChatBot(QueryModifier(QueryFinal))
-                        ShowTextToScreen(f"{Assistantname} : {Answer}")
-                        TextToSpeech(Answer)
-                        SetAssistantStatus("Answering.....")
-                        os._exit(1)
+    # Show and speak the answers in decision order; later ones keep generating meanwhile.
+    for Task in Group.answers():
+        SetAssistantStatus("Searching..." if Task.kind == "realtime" else "Thinking...")
+        Speech = StreamingSpeech()
+        Answer = StreamAnswerToScreen(Task.chunks(), Speech)
+        SetAssistantStatus("Answering...")
+        Speech.finish()
+
+    # A speculative answer that was used goes into the chat log like any other.
+    Guess.commit()
+
+    if any(task.startswith("exit") for task in Decision):
+        os._exit(1)
+
+    return bool(Decision)
 
 
 def FirstThread():
     while True:
 
-        CurrentStatus = GetMicrophoneStatus()
-
-        if CurrentStatus == "True":
+        # Sleep until the mic is switched on; SetMicrophoneStatus wakes this up immediately.
+        WaitForMicrophoneStatus("True")
+        StartTrace()
+        with Span("execution"):
             MainExecution()
 
-        else:
-            AIStatus = GetAssistantStatus()
-
-            if "Available..." in AIStatus:
-                sleep(0.1)
+        # Keep listening while the mic stays on, otherwise go back to idle.
+        if GetMicrophoneStatus() != "True" and "Available..." not in GetAssistantStatus():
+            SetAssistantStatus("Available...")
 
-            else:
-                SetAssistantStatus("Available...")
+# Runs on the UI thread once the first frame is up: report startup time and
+# start the speech recognizer and provider clients in the background.
+def OnWindowReady():
+    if Profiler is not None:
+        Profiler.first_frame()
+    PrewarmSpeechInput()
+    PrewarmBackends()
 
 def SecondThread():
-    GraphicalUserInterface()
+    GraphicalUserInterface(on_ready=OnWindowReady)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,165 @@
+# HTTP service mode: one JARVIS instance for a whole team.
+#
+# Every client works in its own session (Backend/Sessions.py) with its own chat
+# log, decision cache and query context, so conversations never mix. Queries go
+# through the same pipeline as Main.py and Headless.py (Backend/Pipeline.py) on
+# a bounded pool of ServerWorkers request workers, and answers stream back as
+# newline-delimited JSON while they are generated. Once ServerBacklog queries
+# are running or waiting, new ones are refused with 503; a session runs one
+# query at a time (409 while busy) so its turns are logged in order.
+#
+# Automation commands are never run on the server machine: they are reported
+# in the result (dry run) for the client to act on. Image generation is skipped.
+#
+# Endpoints:
+#   POST   /sessions                  -> {"session": id}
+#   POST   /sessions/<id>/query       {"query": "..."}; "stream": false for a single JSON reply
+#   GET    /sessions/<id>/history     -> {"messages": [...]} (last ?limit=100 messages)
+#   DELETE /sessions/<id>             forget the session and its files
+#   GET    /stats                     per-stage latency, sessions and load
+#
+# Streamed lines:
+#   {"event": "chunk", "task": "general who was akbar", "text": "Akbar was ..."}
+#   {"event": "done", "query": ..., "decision": [...], "tasks": [...], "total_ms": ...}
+#   {"event": "error", "error": "..."}
+#
+# .env settings:
+#   ServerHost=127.0.0.1
+#   ServerPort=5000
+#   ServerWorkers=8      (queries processed at once)
+#   ServerBacklog=32     (queries running or waiting before new ones get 503)
+#
+# Usage:
+#   python Server.py
+#   curl -X POST localhost:5000/sessions
+#   curl -N localhost:5000/sessions/<id>/query -H "Content-Type: application/json" -d '{"query": "who was akbar"}'
+
+import json
+import queue
+import threading
+from collections import deque
+from dotenv import dotenv_values
+from flask import Flask, Response, jsonify, request
+
+from Backend.Sessions import SessionManager
+from Backend.TaskOrchestrator import TaskOrchestrator, Workers
+from Backend.Pipeline import RunQuery, Limits
+from Backend.Tracing import StartTrace, Span, TraceStats
+
+env_vars = dotenv_values(".env")
+
+Host = env_vars.get("ServerHost") or "127.0.0.1"
+Port = int(env_vars.get("ServerPort") or 5000)
+ServerWorkers = int(env_vars.get("ServerWorkers") or 8)
+Backlog = int(env_vars.get("ServerBacklog") or 32)
+
+app = Flask(__name__)
+Sessions = SessionManager()
+
+# Whole queries, one per request worker.
+Requests = TaskOrchestrator(workers=ServerWorkers)
+
+# The tasks of every query's decision, shared by all sessions.
+Orchestrator = TaskOrchestrator(workers=max(Workers, 2 * ServerWorkers), limits=Limits)
+
+# Queries running or waiting for a request worker.
+Active = set()
+ActiveLock = threading.Lock()
+
+
+def ProcessQuery(Session, Query, Emit):
+    StartTrace()
+    try:
+        with Span("execution"):
+            Result = RunQuery(
+                Query, Orchestrator, speak=False, dry_run=True,
+                store=Session.store, cache=Session.cache, context=Session.context,
+                on_chunk=lambda Task, Chunk: Emit({"event": "chunk", "task": Task.name, "text": Chunk})
+            )
+    except Exception as e:
+        Emit({"event": "error", "error": str(e)})
+        raise
+    Emit({"event": "done", **Result})
+    return Result
+
+
+# Events of one query up to its "done" or "error", or until it times out.
+def Events(Task, Queue):
+    while True:
+        try:
+            Event = Queue.get(timeout=Task.remaining())
+        except queue.Empty:
+            Task.cancel()
+            yield {"event": "error", "error": "timed out"}
+            return
+        yield Event
+        if Event["event"] != "chunk":
+            return
+
+
+@app.post("/sessions")
+def CreateSession():
+    return jsonify(session=Sessions.create().id), 201
+
+
+@app.post("/sessions/<session_id>/query")
+def QuerySession(session_id):
+    Body = request.get_json(silent=True) or {}
+    Query = " ".join(str(Body.get("query") or "").split())
+    if not Query:
+        return jsonify(error="missing query"), 400
+
+    Queue = queue.Queue()
+    with ActiveLock:
+        Active.difference_update([Task for Task in Active if Task.done.is_set()])
+        if len(Active) >= Backlog:
+            return jsonify(error="server busy"), 503
+        Session, Task = Sessions.run(
+            session_id, lambda Session: Requests.submit(f"query {Session.id}", ProcessQuery, Session, Query, Queue.put)
+        )
+        if Session is None:
+            return jsonify(error="unknown session"), 404
+        if Task is None:
+            return jsonify(error="a query is already running in this session"), 409
+        Active.add(Task)
+
+    if Body.get("stream", True) is False:
+        Last = deque(Events(Task, Queue), maxlen=1)[0]
+        return jsonify(Last), 200 if Last["event"] == "done" else 500
+
+    Lines = (json.dumps(Event, ensure_ascii=False) + "\n" for Event in Events(Task, Queue))
+    return Response(Lines, mimetype="application/x-ndjson")
+
+
+@app.get("/sessions/<session_id>/history")
+def SessionHistory(session_id):
+    Limit = request.args.get("limit", 100, type=int)
+    Session, Messages = Sessions.use(session_id, lambda Session: Session.store.last(Limit))
+    if Session is None:
+        return jsonify(error="unknown session"), 404
+    return jsonify(messages=Messages)
+
+
+@app.delete("/sessions/<session_id>")
+def DeleteSession(session_id):
+    Deleted = Sessions.delete(session_id)
+    if Deleted is None:
+        return jsonify(error="unknown session"), 404
+    if not Deleted:
+        return jsonify(error="a query is running in this session"), 409
+    return "", 204
+
+
+@app.get("/stats")
+def Stats():
+    with ActiveLock:
+        Load = sum(1 for Task in Active if not Task.done.is_set())
+    return jsonify(stages=TraceStats(), sessions=Sessions.stats(), load=Load,
+                   workers=ServerWorkers, backlog=Backlog)
+
+
+if __name__ == "__main__":
+    try:
+        app.run(host=Host, port=Port, threaded=True)
+    finally:
+        Sessions.close_all()